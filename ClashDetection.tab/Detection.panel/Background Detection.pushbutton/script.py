@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Background Clash Detection
+Runs whole-model detection in short time slices while Revit is idle
+"""
+
+__title__ = "Background\nDetection"
+__author__ = "Your Name"
+__doc__ = "Run, pause or resume whole-model clash detection without blocking Revit"
+# Event handlers need the script engine to outlive this click
+__persistentengine__ = True
+
+from pyrevit import revit, forms, script
+
+from clash_collect import collect_model_element_ids
+from clash_scheduler import IdlingDriver
+from clash_session import get_session
+from clash_utils import DetectionJob
+
+doc = revit.doc
+uiapp = __revit__
+
+# The driver is kept in an environment variable so later clicks can reach it
+DRIVER_ENVVAR = 'CLASHDETECTION_BACKGROUND_DRIVER'
+
+# Seconds of work per idle callback
+SLICE_SECONDS = 0.05
+
+def report_progress(output):
+    """Listener printing new clashes and progress after each slice"""
+    state = {'reported': 0}
+    
+    def listener(job):
+        phase, done, total = job.progress
+        if total:
+            output.update_progress(done, total)
+        for clash in job.results[state['reported']:]:
+            output.print_md("- {} {} <-> {} {}".format(
+                output.linkify(clash['elem1'].Id), clash['elem1'].Name,
+                output.linkify(clash['elem2'].Id), clash['elem2'].Name))
+        state['reported'] = len(job.results)
+        if job.done:
+            output.print_md("**Finished: {} clashes**".format(len(job.results)))
+    
+    return listener
+
+def start_detection():
+    """Create a detection job and attach it to Revit's Idling event"""
+    session = get_session(doc)
+    job = DetectionJob(session.engine, collect_model_element_ids(doc, session.matrix),
+                       session.matrix)
+    
+    output = script.get_output()
+    output.print_md("## Background clash detection: {}".format(doc.Title))
+    job.add_listener(report_progress(output))
+    
+    def store_results(job):
+        if job.done and not job.cancelled:
+            # Boxes were collected in slices; tracking must not re-collect them
+            session.adopt_box_table(job.table)
+            session.set_results(job.results, method='Background',
+                                categories=sorted(session.matrix.groups), track=True)
+    job.add_listener(store_results)
+    
+    driver = IdlingDriver(uiapp, job, SLICE_SECONDS)
+    script.set_envvar(DRIVER_ENVVAR, driver)
+    driver.start()
+
+def main():
+    """Start a run, or pause/resume/cancel the current one"""
+    driver = script.get_envvar(DRIVER_ENVVAR)
+    
+    if driver is None or driver.job.done:
+        start_detection()
+    elif driver.running:
+        if forms.alert("Background detection is running ({}).\n\nPause it?".format(
+                driver.job.progress[0]), yes=True, no=True):
+            driver.pause()
+    else:
+        choice = forms.CommandSwitchWindow.show(['Resume', 'Cancel'],
+                                                message='Background detection is paused')
+        if choice == 'Resume':
+            driver.start()
+        elif choice == 'Cancel':
+            driver.job.cancel()
+            script.set_envvar(DRIVER_ENVVAR, None)
+
+if __name__ == '__main__':
+    main()
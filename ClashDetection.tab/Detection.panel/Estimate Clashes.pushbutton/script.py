@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Estimate Clashes
+Estimates the whole-model clash count from a stratified sample of pairs
+"""
+
+__title__ = "Estimate\nClashes"
+__author__ = "Your Name"
+__doc__ = "Estimate how many clashes the model has, and where, before a full run"
+# Event handlers need the script engine to outlive this click
+__persistentengine__ = True
+
+from pyrevit import revit, forms, script
+
+from clash_collect import collect_model_element_ids
+from clash_config import get_option
+from clash_estimate import z_score
+from clash_scheduler import IdlingDriver
+from clash_session import get_session
+from clash_utils import EstimationJob
+
+doc = revit.doc
+uiapp = __revit__
+
+# The driver is kept in an environment variable so later clicks can reach it
+DRIVER_ENVVAR = 'CLASHDETECTION_ESTIMATE_DRIVER'
+
+# Seconds of work per idle callback
+SLICE_SECONDS = 0.05
+
+# Rows shown in each heat map table
+HEAT_MAP_ROWS = 15
+
+def print_heat_map(output, estimate, group, title):
+    """Table of estimated clashes per group, largest first"""
+    rows = sorted(estimate.heat_map(group).items(), key=lambda item: -item[1][0])
+    output.print_table(
+        [[name, int(round(count)), "{} - {}".format(int(low), int(high))]
+         for name, (count, low, high) in rows[:HEAT_MAP_ROWS]],
+        columns=['', 'Estimate', 'Range'],
+        title=title)
+
+def report_estimate(output):
+    """Listener printing the estimate each time the sample doubles"""
+    state = {'next': 50}
+    
+    def listener(job):
+        phase, done, total = job.progress
+        if total:
+            output.update_progress(done, total)
+        estimate = job.estimate
+        if estimate is None:
+            return
+        if estimate.sampled >= state['next'] or job.done:
+            state['next'] = 2 * max(state['next'], estimate.sampled)
+            count, low, high = estimate.estimate()
+            output.print_md("{} of {} pairs checked: **~{} clashes** ({} - {})".format(
+                estimate.sampled, estimate.total, int(round(count)), int(low), int(high)))
+        if job.done and not job.cancelled:
+            print_heat_map(output, estimate, lambda key: key[0], "Clashes by level")
+            print_heat_map(output, estimate, lambda key: key[1], "Clashes by category pair")
+            if job.complete:
+                output.print_md("**Full run finished: {} clashes**".format(len(job.results)))
+            else:
+                output.print_md("Click Estimate Clashes again to promote this to a full run.")
+    
+    return listener
+
+def start_estimate():
+    """Create an estimation job and attach it to Revit's Idling event"""
+    session = get_session(doc)
+    job = EstimationJob(session.engine, collect_model_element_ids(doc, session.matrix),
+                        session.matrix,
+                        sample_size=get_option(session.config, 'estimation.sample_size', 2000),
+                        z=z_score(get_option(session.config, 'estimation.confidence', 0.95)),
+                        table=session.model_box_table())
+    
+    output = script.get_output()
+    output.print_md("## Clash estimate: {}".format(doc.Title))
+    job.add_listener(report_estimate(output))
+    
+    def store_results(job):
+        if job.complete:
+            session.set_results(job.results, method='Progressive',
+                                categories=sorted(session.matrix.groups), track=True)
+    job.add_listener(store_results)
+    
+    driver = IdlingDriver(uiapp, job, SLICE_SECONDS)
+    script.set_envvar(DRIVER_ENVVAR, driver)
+    driver.start()
+
+def main():
+    """Start an estimate, or pause/resume/promote the current one"""
+    driver = script.get_envvar(DRIVER_ENVVAR)
+    
+    if driver is None or driver.job.cancelled or driver.job.complete:
+        start_estimate()
+    elif driver.running:
+        if forms.alert("Clash estimate is running ({}).\n\nPause it?".format(
+                driver.job.progress[0]), yes=True, no=True):
+            driver.pause()
+    else:
+        sampled = driver.job.done
+        choice = forms.CommandSwitchWindow.show(
+            ['Promote to Full Run', 'New Estimate', 'Cancel'] if sampled else ['Resume', 'Cancel'],
+            message='Sample finished' if sampled else 'Clash estimate is paused')
+        if choice == 'Promote to Full Run':
+            driver.job.promote()
+            driver.start()
+        elif choice == 'Resume':
+            driver.start()
+        elif choice == 'New Estimate':
+            start_estimate()
+        elif choice == 'Cancel':
+            driver.job.cancel()
+            script.set_envvar(DRIVER_ENVVAR, None)
+
+if __name__ == '__main__':
+    main()
@@ -13,62 +13,45 @@ from Autodesk.Revit.UI import TaskDialog
 from pyrevit import revit, forms
 import clr
 
+from clash_geometry import find_candidate_pairs
+from clash_session import get_session
+
 doc = revit.doc
 uidoc = revit.uidoc
 
+# Categories checked by Quick Check
+CATEGORIES_TO_CHECK = [
+    DB.BuiltInCategory.OST_Walls,
+    DB.BuiltInCategory.OST_Columns,
+    DB.BuiltInCategory.OST_StructuralFraming,
+    DB.BuiltInCategory.OST_Floors,
+    DB.BuiltInCategory.OST_Roofs,
+    DB.BuiltInCategory.OST_Doors,
+    DB.BuiltInCategory.OST_Windows,
+    DB.BuiltInCategory.OST_DuctCurves,
+    DB.BuiltInCategory.OST_PipeCurves
+]
+
 def quick_check():
     """Perform quick clash check on visible elements"""
     # Get active view
     active_view = doc.ActiveView
     
-    # Filter for model elements in view
-    collector = DB.FilteredElementCollector(doc, active_view.Id)
-    elements = collector.WhereElementIsNotElementType().ToElements()
-    
-    # Filter for geometric elements only
-    geo_elements = []
-    categories_to_check = [
-        DB.BuiltInCategory.OST_Walls,
-        DB.BuiltInCategory.OST_Columns,
-        DB.BuiltInCategory.OST_StructuralFraming,
-        DB.BuiltInCategory.OST_Floors,
-        DB.BuiltInCategory.OST_Roofs,
-        DB.BuiltInCategory.OST_Doors,
-        DB.BuiltInCategory.OST_Windows,
-        DB.BuiltInCategory.OST_DuctCurves,
-        DB.BuiltInCategory.OST_PipeCurves
-    ]
-    
-    for elem in elements:
-        try:
-            if elem.Category and elem.Category.Id.IntegerValue in [cat.value__ for cat in categories_to_check]:
-                geo_elements.append(elem)
-        except:
-            pass
+    # Category and type filters run inside the collector and each
+    # bounding box is fetched once; the table is kept in the session
+    # until the model changes
+    table = get_session(doc).view_box_table(active_view, CATEGORIES_TO_CHECK)
     
-    # Quick bounding box check
-    clashes = []
-    for i in range(len(geo_elements)):
-        for j in range(i + 1, len(geo_elements)):
-            elem1 = geo_elements[i]
-            elem2 = geo_elements[j]
-            
-            # Get bounding boxes
-            bb1 = elem1.get_BoundingBox(active_view)
-            bb2 = elem2.get_BoundingBox(active_view)
-            
-            if bb1 and bb2:
-                # Check if bounding boxes intersect
-                if (bb1.Min.X <= bb2.Max.X and bb1.Max.X >= bb2.Min.X and
-                    bb1.Min.Y <= bb2.Max.Y and bb1.Max.Y >= bb2.Min.Y and
-                    bb1.Min.Z <= bb2.Max.Z and bb1.Max.Z >= bb2.Min.Z):
-                    clashes.append((elem1, elem2))
+    # Pairs come from a sweep over the box table instead of testing every pair
+    clashes = find_candidate_pairs(table.items())
     
     # Report results
     if clashes:
         message = "Potential clashes found: {}\n\n".format(len(clashes))
         message += "First 5 potential clashes:\n"
-        for clash in clashes[:5]:
+        for id1, id2 in clashes[:5]:
+            # Only the listed elements are loaded
+            clash = (doc.GetElement(DB.ElementId(id1)), doc.GetElement(DB.ElementId(id2)))
             message += "• {} <-> {}\n".format(
                 clash[0].Name if hasattr(clash[0], 'Name') else clash[0].Id,
                 clash[1].Name if hasattr(clash[1], 'Name') else clash[1].Id
@@ -16,54 +16,25 @@ import clr
 clr.AddReference('System')
 from System.Collections.Generic import List
 
+from clash_session import get_session
+
 # Get current document
 doc = revit.doc
 uidoc = revit.uidoc
 
-def get_element_geometry(element):
-    """Extract solid geometry from element"""
-    options = DB.Options()
-    options.ComputeReferences = True
-    options.IncludeNonVisibleObjects = False
-    
-    geo_elem = element.get_Geometry(options)
-    solids = []
+def detect_model(session):
+    """Tiled detection over every configured category in the model"""
+    table = session.model_box_table()
+    element_ids = [DB.ElementId(element_id) for element_id in table.ids]
     
-    if geo_elem:
-        for geo_obj in geo_elem:
-            if isinstance(geo_obj, DB.Solid) and geo_obj.Volume > 0:
-                solids.append(geo_obj)
-            elif isinstance(geo_obj, DB.GeometryInstance):
-                instance_geo = geo_obj.GetInstanceGeometry()
-                for inst_obj in instance_geo:
-                    if isinstance(inst_obj, DB.Solid) and inst_obj.Volume > 0:
-                        solids.append(inst_obj)
-    return solids
-
-def check_intersection(solid1, solid2):
-    """Check if two solids intersect"""
-    try:
-        intersection = DB.BooleanOperationsUtils.ExecuteBooleanOperation(
-            solid1, solid2, DB.BooleanOperationsType.Intersect
-        )
-        if intersection and intersection.Volume > 0:
-            return True, intersection.Volume
-    except:
-        pass
-    return False, 0
+    # Clashes stream out of the engine tile by tile; only the small
+    # clash dicts are kept, tile geometry is released as it goes
+    with forms.ProgressBar(title='Detecting Clashes (tiled)...') as pb:
+        progress = lambda index, total: pb.update_progress(index, total)
+        return list(session.engine.detect_tiled(element_ids, session.matrix, progress, table))
 
-def main():
-    """Main function"""
-    # Get selected elements
-    selection = uidoc.Selection.GetElementIds()
-    
-    if selection.Count < 2:
-        TaskDialog.Show("Clash Detection", 
-                       "Please select at least 2 elements to check for clashes")
-        return
-    
-    elements = [doc.GetElement(id) for id in selection]
-    
+def detect_selection(engine, elements):
+    """Check every pair of the selected elements"""
     # Progress bar
     with forms.ProgressBar(title='Detecting Clashes...') as pb:
         clashes = []
@@ -75,21 +46,32 @@ def main():
                 current += 1
                 pb.update_progress(current, total_checks)
                 
-                elem1 = elements[i]
-                elem2 = elements[j]
-                
-                solids1 = get_element_geometry(elem1)
-                solids2 = get_element_geometry(elem2)
-                
-                for solid1 in solids1:
-                    for solid2 in solids2:
-                        has_clash, volume = check_intersection(solid1, solid2)
-                        if has_clash:
-                            clashes.append({
-                                'elem1': elem1,
-                                'elem2': elem2,
-                                'volume': volume
-                            })
+                # Geometry is cached per element and detail level by the engine
+                clash = engine.detect_clash(elements[i], elements[j])
+                if clash:
+                    clashes.append(clash)
+    
+    return clashes
+
+def main():
+    """Main function"""
+    # Engine, geometry caches and box tables persist between runs
+    session = get_session(doc)
+    
+    # Get selected elements
+    selection = uidoc.Selection.GetElementIds()
+    
+    if selection.Count < 2:
+        if not forms.alert("Fewer than 2 elements selected.\n\n"
+                           "Run tiled detection on the whole model?",
+                           title="Clash Detection", yes=True, no=True):
+            return
+        clashes = detect_model(session)
+        session.set_results(clashes, method='Tiled', categories=sorted(session.matrix.groups),
+                            track=True)
+    else:
+        clashes = detect_selection(session.engine, [doc.GetElement(id) for id in selection])
+        session.set_results(clashes, method='Selection')
     
     # Report results
     if clashes:
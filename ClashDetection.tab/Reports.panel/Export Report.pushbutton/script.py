@@ -11,107 +11,67 @@ __doc__ = "Export clash detection results to Excel, CSV or HTML"
 from pyrevit import revit, forms, script
 from Autodesk.Revit import DB
 import os
-import csv
-import json
-from datetime import datetime
+
+from clash_config import get_option
+from clash_render import THUMBNAIL_SIZE, context_elements, data_uri, render_clash
+from clash_reports import REPORT_FORMATS, export_report
+from clash_session import find_session
 
 doc = revit.doc
 
-def export_to_csv(clashes, filepath):
-    """Export clashes to CSV format"""
-    with open(filepath, 'w', newline='') as csvfile:
-        fieldnames = ['Index', 'Element1_Id', 'Element1_Name', 'Element1_Category',
-                     'Element2_Id', 'Element2_Name', 'Element2_Category',
-                     'Clash_Volume', 'Level', 'Status']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for i, clash in enumerate(clashes, 1):
-            writer.writerow({
-                'Index': i,
-                'Element1_Id': clash['elem1'].Id.IntegerValue,
-                'Element1_Name': clash['elem1'].Name,
-                'Element1_Category': clash['elem1'].Category.Name,
-                'Element2_Id': clash['elem2'].Id.IntegerValue,
-                'Element2_Name': clash['elem2'].Name,
-                'Element2_Category': clash['elem2'].Category.Name,
-                'Clash_Volume': clash.get('volume', 'N/A'),
-                'Level': clash.get('level', 'N/A'),
-                'Status': clash.get('status', 'New')
-            })
+def element_box(table, element):
+    """Box of an element, from the session table when it has one"""
+    key = element.Id.IntegerValue
+    if key in table:
+        return table.box(key)
+    bb = element.get_BoundingBox(None)
+    return (bb.Min.X, bb.Min.Y, bb.Min.Z, bb.Max.X, bb.Max.Y, bb.Max.Z)
 
-def export_to_html(clashes, filepath):
-    """Export clashes to HTML format"""
-    html_content = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Clash Detection Report</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 20px; }
-            h1 { color: #333; }
-            table { border-collapse: collapse; width: 100%; }
-            th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-            th { background-color: #4CAF50; color: white; }
-            tr:nth-child(even) { background-color: #f2f2f2; }
-            .summary { background-color: #e7f3fe; padding: 15px; margin-bottom: 20px; }
-        </style>
-    </head>
-    <body>
-        <h1>Clash Detection Report</h1>
-        <div class="summary">
-            <h2>Summary</h2>
-            <p>Project: {}</p>
-            <p>Date: {}</p>
-            <p>Total Clashes: {}</p>
-        </div>
-        <table>
-            <tr>
-                <th>#</th>
-                <th>Element 1</th>
-                <th>Category 1</th>
-                <th>Element 2</th>
-                <th>Category 2</th>
-                <th>Status</th>
-            </tr>
-    """.format(doc.Title, datetime.now().strftime("%Y-%m-%d %H:%M"), len(clashes))
-    
-    for i, clash in enumerate(clashes, 1):
-        html_content += """
-            <tr>
-                <td>{}</td>
-                <td>{}</td>
-                <td>{}</td>
-                <td>{}</td>
-                <td>{}</td>
-                <td>{}</td>
-            </tr>
-        """.format(i, 
-                  clash['elem1'].Name,
-                  clash['elem1'].Category.Name,
-                  clash['elem2'].Name,
-                  clash['elem2'].Category.Name,
-                  clash.get('status', 'New'))
-    
-    html_content += """
-        </table>
-    </body>
-    </html>
+def add_thumbnails(session, records, size):
+    """Render a clash thumbnail into each record
+
+    Elements are triangulated per clash and released afterwards, unless
+    the engine already held their geometry before rendering.
     """
+    engine = session.engine
+    table = session.model_box_table()
+    clashes = [(clash['elem1'].Id.IntegerValue, element_box(table, clash['elem1']),
+                clash['elem2'].Id.IntegerValue, element_box(table, clash['elem2']))
+               for clash in session.results]
+    context = context_elements(clashes, table.items())
     
-    with open(filepath, 'w') as f:
-        f.write(html_content)
+    def meshes(element_ids):
+        cached = set(element_id for element_id in element_ids if engine.has_cached(element_id))
+        result = [engine.get_screening_mesh(doc.GetElement(DB.ElementId(element_id)))
+                  for element_id in element_ids]
+        engine.clear_cache(element_id for element_id in element_ids
+                           if element_id not in cached)
+        return result
+    
+    with forms.ProgressBar(title='Rendering Clash Thumbnails...') as pb:
+        for i, ((id1, box1, id2, box2), around, record) in enumerate(
+                zip(clashes, context, records)):
+            found = meshes([id1, id2] + around)
+            png = render_clash((found[0], found[1], box1, box2, found[2:], size))
+            record['thumbnail'] = data_uri(png)
+            pb.update_progress(i + 1, len(clashes))
 
 def main():
     """Main export function"""
-    # Get stored clash data (in real implementation, this would come from detection)
-    # For demo, create sample data
-    sample_clashes = []
+    # Latest results of this document's session
+    session = find_session(doc)
+    results = session.results if session else None
+    if results is None:
+        forms.alert("No clash results yet. Run detection first.", title="Export Report")
+        return
+    if results.stale and not forms.alert(
+            "The model changed since the last run ({}).\n\nExport anyway?".format(results.created),
+            yes=True, no=True):
+        return
     
     # Ask user for export format
-    formats = ['CSV', 'HTML', 'JSON']
     selected_format = forms.SelectFromList.show(
-        formats,
+        REPORT_FORMATS,
         title='Select Export Format',
         button_name='Export'
     )
@@ -124,14 +84,15 @@ def main():
     if not save_dialog:
         return
     
-    # Export based on format
-    if selected_format == 'CSV':
-        export_to_csv(sample_clashes, save_dialog)
-    elif selected_format == 'HTML':
-        export_to_html(sample_clashes, save_dialog)
-    elif selected_format == 'JSON':
-        with open(save_dialog, 'w') as f:
-            json.dump(sample_clashes, f, indent=4, default=str)
+    # Clash points and overlap ratios for every clash in one pass
+    session.clash_boxes()
+    records = results.records()
+    config = session.config
+    if selected_format == 'HTML' and get_option(config, 'reporting.include_screenshots', False):
+        size = get_option(config, 'reporting.thumbnail_size', THUMBNAIL_SIZE)
+        add_thumbnails(session, records, tuple(size))
+    
+    export_report(records, save_dialog, selected_format, project=doc.Title)
     
     forms.alert("Report exported successfully!", title="Export Complete")
 
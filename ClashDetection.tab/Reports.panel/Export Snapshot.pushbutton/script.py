@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Export Geometry Snapshot
+Save triangulated model geometry for later runs and the headless batch runner
+"""
+
+__title__ = "Export\nSnapshot"
+__author__ = "Your Name"
+__doc__ = "Export element geometry to a snapshot file for batch clash detection"
+
+from pyrevit import revit, forms
+import os
+
+from clash_collect import collect_model_element_ids
+from clash_session import get_session
+from clash_snapshot import GeometrySnapshot, SnapshotError
+
+doc = revit.doc
+
+def main():
+    """Main function"""
+    path = forms.save_file(file_ext='snap', default_name=doc.Title)
+    if not path:
+        return
+    
+    session = get_session(doc)
+    element_ids = collect_model_element_ids(doc, session.matrix)
+    if not element_ids:
+        forms.alert("No elements of the configured categories found.", title="Export Snapshot")
+        return
+    
+    # Unchanged elements are copied from an existing snapshot at the same path
+    previous = None
+    if os.path.exists(path):
+        try:
+            previous = GeometrySnapshot(path)
+        except SnapshotError:
+            previous = None
+    
+    # Geometry the session already holds is reused; the rest is released as it is written
+    engine = session.engine
+    temp_path = path + '.tmp'
+    try:
+        elements = (doc.GetElement(element_id) for element_id in element_ids)
+        extracted, reused = engine.write_snapshot(elements, temp_path, previous)
+    finally:
+        if previous:
+            previous.close()
+    
+    # A mapped file cannot be replaced, so swap only after closing it
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp_path, path)
+    
+    forms.alert("Snapshot saved.\n\nExtracted: {}\nReused: {}".format(extracted, reused),
+                title="Export Snapshot")
+
+if __name__ == '__main__':
+    main()
@@ -13,18 +13,14 @@ from datetime import datetime
 import json
 import os
 
+from clash_fingerprint import ClashHistory
+from clash_session import history_path
+
 doc = revit.doc
-config = script.get_config()
 
 def load_history():
-    """Load clash history from config"""
-    history = config.get_option('clash_history', [])
-    return history
-
-def save_history(history):
-    """Save clash history to config"""
-    config.set_option('clash_history', history)
-    script.save_config()
+    """Load the run log written by tracked whole-model runs"""
+    return ClashHistory.load_runs(history_path(doc))
 
 def main():
     """Display clash history"""
@@ -63,6 +59,8 @@ def main():
         details = """
         Date: {}
         Total Clashes: {}
+        New: {}
+        Reintroduced: {}
         Resolved: {}
         Pending: {}
         Categories Checked: {}
@@ -70,6 +68,8 @@ def main():
         """.format(
             record.get('date', 'Unknown'),
             record.get('clash_count', 0),
+            record.get('new', 0),
+            record.get('reintroduced', 0),
             record.get('resolved', 0),
             record.get('clash_count', 0) - record.get('resolved', 0),
             ', '.join(record.get('categories', [])),
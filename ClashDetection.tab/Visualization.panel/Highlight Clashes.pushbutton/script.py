@@ -16,10 +16,15 @@ import clr
 clr.AddReference('System')
 from System.Collections.Generic import List
 
+from clash_session import find_session
+
 doc = revit.doc
 uidoc = revit.uidoc
 app = revit.app
 
+# Space kept around clashes when zooming or sectioning, in feet
+CLASH_MARGIN = 3.0
+
 def create_override_settings(color):
     """Create graphic override settings with specified color"""
     override = DB.OverrideGraphicSettings()
@@ -74,6 +79,35 @@ def isolate_elements(element_ids):
     with revit.Transaction("Isolate Clashing Elements"):
         view.IsolateElementsTemporary(id_collection)
 
+def clash_extent(session):
+    """Box around every clash of the latest results, with a margin"""
+    box = session.clash_boxes().extent()
+    if box is None:
+        return None
+    return (DB.XYZ(box[0] - CLASH_MARGIN, box[1] - CLASH_MARGIN, box[2] - CLASH_MARGIN),
+            DB.XYZ(box[3] + CLASH_MARGIN, box[4] + CLASH_MARGIN, box[5] + CLASH_MARGIN))
+
+def zoom_to(corners):
+    """Zoom the active view to a (min, max) pair of points"""
+    for ui_view in uidoc.GetOpenUIViews():
+        if ui_view.ViewId == doc.ActiveView.Id:
+            ui_view.ZoomAndCenterRectangle(corners[0], corners[1])
+
+def section_box_to(corners):
+    """Set the section box of the active 3D view to a (min, max) pair of points"""
+    view = doc.ActiveView
+    if not isinstance(view, DB.View3D):
+        TaskDialog.Show("Error", "Open a 3D view to set a section box")
+        return False
+    
+    box = DB.BoundingBoxXYZ()
+    box.Min = corners[0]
+    box.Max = corners[1]
+    with revit.Transaction("Section Box Around Clashes"):
+        view.SetSectionBox(box)
+        view.IsSectionBoxActive = True
+    return True
+
 def reset_view():
     """Reset all temporary isolation and overrides"""
     view = doc.ActiveView
@@ -94,7 +128,7 @@ def main():
     """Main function"""
     # Options for user
     options = ["Highlight Selected", "Isolate Selected", 
-               "Reset View", "Auto-Detect and Highlight"]
+               "Reset View", "Auto-Detect and Highlight", "Section Box Around Clashes"]
     
     selected_option = forms.SelectFromList.show(
         options,
@@ -110,6 +144,28 @@ def main():
         TaskDialog.Show("Success", "View reset completed")
         return
     
+    if selected_option in ("Auto-Detect and Highlight", "Section Box Around Clashes"):
+        # Reuse the latest results instead of detecting again
+        session = find_session(doc)
+        if session is None or session.results is None:
+            TaskDialog.Show("Error", "No clash results yet. Run detection first")
+            return
+        visualization = session.config.get('visualization', {})
+        corners = clash_extent(session)
+        
+        if selected_option == "Section Box Around Clashes":
+            if corners and section_box_to(corners):
+                TaskDialog.Show("Success", "Section box set around {} clashes".format(
+                    len(session.results)))
+            return
+        
+        element_ids = session.results.element_ids()
+        highlight_elements(element_ids, visualization.get('default_color', 'Red'))
+        if corners and visualization.get('auto_zoom', False):
+            zoom_to(corners)
+        TaskDialog.Show("Success", "{} clashing elements highlighted".format(len(element_ids)))
+        return
+    
     # Get selected elements
     selection = uidoc.Selection.GetElementIds()
     
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Document changed hook
+Invalidate cached clash detection state for edited elements
+"""
+
+from pyrevit import EXEC_PARAMS
+
+from clash_session import find_session
+
+args = EXEC_PARAMS.event_args
+doc = args.GetDocument()
+
+# Only documents with an active clash session carry state to invalidate
+session = find_session(doc)
+if session:
+    session.on_document_changed(args.GetModifiedElementIds(),
+                                args.GetDeletedElementIds(),
+                                args.GetAddedElementIds())
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+Document closing hook
+Release cached clash detection state of the closing document
+"""
+
+from pyrevit import EXEC_PARAMS
+
+from clash_session import close_session
+
+doc = EXEC_PARAMS.event_args.Document
+
+if doc:
+    close_session(doc)
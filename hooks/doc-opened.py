@@ -8,9 +8,21 @@ from Autodesk.Revit import DB
 from pyrevit import EXEC_PARAMS, revit
 from pyrevit.userconfig import user_config
 
+from clash_collect import model_statistics
+
 # This hook runs when a document is opened
 doc = EXEC_PARAMS.event_args.Document
 
+# Categories counted to judge model size
+STATISTIC_CATEGORIES = [
+    DB.BuiltInCategory.OST_Walls,
+    DB.BuiltInCategory.OST_Floors,
+    DB.BuiltInCategory.OST_StructuralColumns,
+    DB.BuiltInCategory.OST_StructuralFraming,
+    DB.BuiltInCategory.OST_DuctCurves,
+    DB.BuiltInCategory.OST_PipeCurves
+]
+
 def check_initial_clashes():
     """Run initial clash check on document open"""
     # Get user preferences
@@ -20,12 +32,14 @@ def check_initial_clashes():
     if not auto_check:
         return
     
-    # Quick check for obvious clashes
-    collector = DB.FilteredElementCollector(doc)
-    walls = collector.OfCategory(DB.BuiltInCategory.OST_Walls).ToElements()
+    # Count elements without loading them
+    statistics = model_statistics(doc, STATISTIC_CATEGORIES)
+    wall_count = statistics[str(DB.BuiltInCategory.OST_Walls)]
     
-    if len(walls) > 100:
-        print("Large model detected - {} walls found".format(len(walls)))
+    if wall_count > 100:
+        print("Large model detected - {} walls found".format(wall_count))
+        for category, count in sorted(statistics.items()):
+            print("  {}: {}".format(category, count))
         print("Consider running clash detection manually")
     else:
         print("Model loaded - ready for clash detection")
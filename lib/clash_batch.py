@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Headless Batch Clash Runner
+Runs clash detection over exported geometry snapshots without Revit,
+spreading model pairs (or spatial tiles of them) across a process pool.
+Rules and the clash matrix come from config.json; reports are written
+in the extension's CSV, HTML and JSON formats, one per model pair.
+
+Usage:
+    python lib/clash_batch.py --output reports --format CSV --format HTML \\
+        --workers 8 --tile-size 100 arch.snap struct.snap mep.snap
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from bisect import bisect_right
+
+from clash_config import CONFIG_PATH, MM_PER_FOOT, ClashMatrix, load_config
+from clash_geometry import box_intersection, box_volume, find_candidate_pairs, meshes_intersect
+from clash_render import THUMBNAIL_SIZE, context_elements, data_uri, render_clash
+from clash_reports import REPORT_FORMATS, add_location, export_report
+from clash_snapshot import GeometrySnapshot
+from clash_tiles import make_tiles, tile_owns_pair
+from clash_voxels import estimate_overlap_volume
+
+# Per-process state, set up by _init_worker
+_settings = {}
+_snapshots = {}
+_elements = {}
+
+
+class BatchSettings:
+    """Detection rules shared by every task"""
+
+    def __init__(self, config, formats=('CSV',)):
+        rules = config.get('detection_rules', {})
+        self.matrix = ClashMatrix(config)
+        self.tolerance = config.get('tolerance_mm', 0.0) / MM_PER_FOOT
+        self.minimum_volume = rules.get('minimum_clash_volume', 0.0)
+        reporting = config.get('reporting', {})
+        # Thumbnails are rendered in the workers, next to the cached meshes,
+        # and only HTML reports show them
+        self.thumbnail_size = None
+        if reporting.get('include_screenshots') and 'HTML' in formats:
+            self.thumbnail_size = tuple(reporting.get('thumbnail_size') or THUMBNAIL_SIZE)
+
+
+def _init_worker(config, formats):
+    _settings['rules'] = BatchSettings(config, formats)
+    _elements.clear()
+
+
+def _open_snapshot(path):
+    # Snapshots stay mapped for the life of the worker
+    if path not in _snapshots:
+        _snapshots[path] = GeometrySnapshot(path)
+    return _snapshots[path]
+
+
+def _model_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _enabled_elements(path, rules):
+    """(min x list, (element id, box) list, {element id: category}) of a snapshot
+
+    Only elements in enabled categories are kept, sorted by min x. Built
+    once per worker, so tile tasks do not re-read every record.
+    """
+    if path not in _elements:
+        snapshot = _open_snapshot(path)
+        items = []
+        categories = {}
+        for element_id in snapshot.element_ids:
+            info = snapshot.info(element_id)
+            if rules.matrix.category_enabled(info['category']):
+                items.append((element_id, info['box']))
+                categories[element_id] = info['category']
+        items.sort(key=lambda item: item[1][0])
+        _elements[path] = ([box[0] for _, box in items], items, categories)
+    return _elements[path]
+
+
+def _candidates(path, rules, tile):
+    """(element id, box) of enabled elements touching a tile, and their categories"""
+    xs, items, categories = _enabled_elements(path, rules)
+    if not tile:
+        return items, categories
+    tol = rules.tolerance
+    # Elements starting past the tile's max x cannot touch it
+    end = bisect_right(xs, tile[3] + tol)
+    return [(element_id, box) for element_id, box in items[:end]
+            if not (box[3] + tol < tile[0] or box[4] + tol < tile[1] or
+                    box[1] - tol > tile[4])], categories
+
+
+def _attach_thumbnails(clashes, items, size):
+    """Render a thumbnail into each clash record
+
+    clashes are (key1, box1, key2, box2, record) with (path, element id)
+    keys; meshes are loaded once per task and shared between clashes.
+    """
+    meshes = {}
+
+    def mesh(key):
+        if key not in meshes:
+            meshes[key] = _open_snapshot(key[0]).mesh(key[1])
+        return meshes[key]
+
+    context = context_elements([clash[:4] for clash in clashes], items)
+    for (key1, box1, key2, box2, record), around in zip(clashes, context):
+        png = render_clash((mesh(key1), mesh(key2), box1, box2,
+                            [mesh(key) for key in around], size))
+        record['thumbnail'] = data_uri(png)
+
+
+def run_task(task):
+    """Detect clashes for one model pair, optionally limited to one tile"""
+    path1, path2, tile = task
+    rules = _settings['rules']
+    snapshot1 = _open_snapshot(path1)
+    snapshot2 = _open_snapshot(path2)
+
+    items1, categories1 = _candidates(path1, rules, tile)
+    if path1 == path2:
+        items2, categories2 = [], categories1
+        pairs = find_candidate_pairs(items1, tolerance=rules.tolerance)
+    else:
+        items2, categories2 = _candidates(path2, rules, tile)
+        pairs = find_candidate_pairs(items1, items2, tolerance=rules.tolerance)
+
+    records = []
+    clashes = []
+    for id1, id2 in pairs:
+        if not rules.matrix.allows(categories1[id1], categories2[id2]):
+            continue
+        box1 = snapshot1.box(id1)
+        box2 = snapshot2.box(id2)
+        if tile and not tile_owns_pair(tile, box1, box2):
+            continue
+
+        region = box_intersection(box1, box2)
+        if region is None:
+            continue
+        mesh1 = snapshot1.mesh(id1)
+        mesh2 = snapshot2.mesh(id2)
+        if not meshes_intersect(mesh1, mesh2, region):
+            continue
+        volume = estimate_overlap_volume(mesh1, mesh2, region)
+        if volume < rules.minimum_volume:
+            continue
+
+        info1 = snapshot1.info(id1)
+        info2 = snapshot2.info(id2)
+        record = {
+            'model1': _model_name(path1),
+            'model2': _model_name(path2),
+            'element1_id': id1,
+            'element1_unique_id': info1['unique_id'],
+            'element1_name': info1['name'],
+            'element1_category': info1['category'],
+            'element2_id': id2,
+            'element2_unique_id': info2['unique_id'],
+            'element2_name': info2['name'],
+            'element2_category': info2['category'],
+            'volume': volume,
+            'level': info1['level'] or info2['level'],
+            'status': 'New'
+        }
+        smaller = min(box_volume(box1), box_volume(box2))
+        add_location(record, ((region[0] + region[3]) / 2.0, (region[1] + region[4]) / 2.0,
+                              (region[2] + region[5]) / 2.0),
+                     box_volume(region) / smaller if smaller > 0 else 0.0)
+        records.append(record)
+        clashes.append(((path1, id1), box1, (path2, id2), box2, record))
+
+    if rules.thumbnail_size and clashes:
+        items = [((path1, element_id), box) for element_id, box in items1]
+        items.extend(((path2, element_id), box) for element_id, box in items2)
+        _attach_thumbnails(clashes, items, rules.thumbnail_size)
+    return path1, path2, records
+
+
+def plan_tasks(paths, tile_size=None, cross_only=False):
+    """One task per model pair, or per tile of each pair when tile_size is set"""
+    tasks = []
+    for i, path1 in enumerate(paths):
+        for path2 in paths[i:]:
+            if cross_only and path1 == path2:
+                continue
+            if not tile_size:
+                tasks.append((path1, path2, None))
+                continue
+            boxes = []
+            for path in set((path1, path2)):
+                with GeometrySnapshot(path) as snapshot:
+                    boxes.extend(snapshot.box(element_id) for element_id in snapshot.element_ids)
+            if not boxes:
+                continue
+            extent = (min(b[0] for b in boxes), min(b[1] for b in boxes), min(b[2] for b in boxes),
+                      max(b[3] for b in boxes), max(b[4] for b in boxes), max(b[5] for b in boxes))
+            tasks.extend((path1, path2, tile) for tile in make_tiles(extent, tile_size))
+    return tasks
+
+
+def run_batch(paths, output_dir, formats, config, workers=None, tile_size=None,
+              cross_only=False):
+    """Run all tasks in a process pool and write one report per model pair"""
+    tasks = plan_tasks(paths, tile_size, cross_only)
+    results = {}
+    for path1, path2 in set((task[0], task[1]) for task in tasks):
+        results[(path1, path2)] = []
+
+    pool = multiprocessing.Pool(workers, _init_worker, (config, formats))
+    try:
+        for path1, path2, records in pool.imap_unordered(run_task, tasks):
+            results[(path1, path2)].extend(records)
+    finally:
+        pool.close()
+        pool.join()
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    for (path1, path2), records in sorted(results.items()):
+        records.sort(key=lambda record: (record['element1_id'], record['element2_id']))
+        name = '{}__{}'.format(_model_name(path1), _model_name(path2))
+        for report_format in formats:
+            filepath = os.path.join(output_dir, '{}.{}'.format(name, report_format.lower()))
+            export_report(records, filepath, report_format, project=name)
+        print("{}: {} clashes".format(name, len(records)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless clash detection over geometry snapshots")
+    parser.add_argument('snapshots', nargs='+', help="Snapshot files exported from Revit")
+    parser.add_argument('--config', default=CONFIG_PATH, help="Path to config.json")
+    parser.add_argument('--output', default='.', help="Directory for report files")
+    parser.add_argument('--format', dest='formats', action='append', choices=REPORT_FORMATS,
+                        help="Report format, may be repeated (default: CSV)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--tile-size', type=float, default=None,
+                        help="Split each model pair into XY tiles of this size in feet")
+    parser.add_argument('--cross-only', action='store_true',
+                        help="Skip clashes within a single model")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    run_batch(args.snapshots, args.output, args.formats or ['CSV'], load_config(args.config),
+              workers=args.workers, tile_size=args.tile_size, cross_only=args.cross_only)
+    print("Finished in {:.1f}s".format(time.time() - started))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Element Collection
+Shared element gathering for the clash tools. Category and type
+filters run as quick collector filters inside Revit, results
+stay as ElementIds, and each AABB is fetched once into a compact table.
+"""
+
+from Autodesk.Revit import DB
+from array import array
+import clr
+
+from clash_geometry import intersection_boxes
+
+clr.AddReference('System')
+from System.Collections.Generic import List
+
+
+def category_ids(doc, categories):
+    """ElementIds for BuiltInCategory values and/or category names"""
+    ids = List[DB.ElementId]()
+    names = set()
+    for category in categories:
+        if isinstance(category, DB.BuiltInCategory):
+            ids.Add(DB.ElementId(category))
+        else:
+            names.add(category)
+
+    if names:
+        for category in doc.Settings.Categories:
+            if category.Name in names:
+                ids.Add(category.Id)
+    return ids
+
+
+def element_collector(doc, categories, view=None):
+    """Collector of instances in the given categories, filtered inside Revit"""
+    if view is not None:
+        collector = DB.FilteredElementCollector(doc, view.Id)
+    else:
+        collector = DB.FilteredElementCollector(doc)
+
+    collector = collector.WherePasses(DB.ElementMulticategoryFilter(category_ids(doc, categories)))
+    return collector.WhereElementIsNotElementType()
+
+
+def collect_element_ids(doc, categories, view=None):
+    """Ids of instances in the given categories, without loading elements"""
+    if not categories:
+        return []
+    return list(element_collector(doc, categories, view).ToElementIds())
+
+
+def collect_model_element_ids(doc, matrix):
+    """Ids of all instances in categories enabled by a ClashMatrix"""
+    names = [category.Name for category in doc.Settings.Categories
+             if matrix.category_enabled(category.Name)]
+    return collect_element_ids(doc, names)
+
+
+def count_elements(doc, category):
+    """Instance count of one category without materializing elements"""
+    collector = DB.FilteredElementCollector(doc).OfCategory(category)
+    return collector.WhereElementIsNotElementType().GetElementCount()
+
+
+def model_statistics(doc, categories):
+    """Instance counts per category, e.g. to warn about large models"""
+    return dict((str(category), count_elements(doc, category)) for category in categories)
+
+
+class BoundingBoxTable:
+    """Compact AABB table, fetched once per element
+
+    Coordinates are stored in one flat array of doubles, six per element.
+    Elements without a bounding box, or no longer in the document, are
+    left out.
+    """
+
+    def __init__(self, doc, element_ids, view=None):
+        self.doc = doc
+        self.view = view
+        self.ids = []
+        self.coords = array('d')
+        self._index = {}
+        self.extend(element_ids)
+
+    def extend(self, element_ids):
+        """Fetch and add the boxes of more elements"""
+        for element_id in element_ids:
+            element = self.doc.GetElement(element_id)
+            # Elements deleted since collection (e.g. while a job was paused)
+            if element is None:
+                continue
+            bb = element.get_BoundingBox(self.view)
+            if bb:
+                self._index[element_id.IntegerValue] = len(self.ids)
+                self.ids.append(element_id.IntegerValue)
+                self.coords.extend((bb.Min.X, bb.Min.Y, bb.Min.Z,
+                                    bb.Max.X, bb.Max.Y, bb.Max.Z))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, element_id):
+        return element_id in self._index
+
+    def box(self, element_id):
+        """Box tuple of an element id (integer value)"""
+        start = 6 * self._index[element_id]
+        return tuple(self.coords[start:start + 6])
+
+    def items(self):
+        """(element id, box) pairs for the broad phase"""
+        coords = self.coords
+        return [(element_id, tuple(coords[6 * n:6 * n + 6]))
+                for n, element_id in enumerate(self.ids)]
+
+    def clash_boxes(self, pairs, centroids=None):
+        """ClashBoxes for (element id, element id) integer pairs
+
+        Elements missing from the table are fetched once first; pairs with
+        an element that has no bounding box are left as zeros.
+        """
+        missing = set(element_id for pair in pairs for element_id in pair
+                      if element_id not in self._index)
+        if missing:
+            self.extend(DB.ElementId(element_id) for element_id in sorted(missing))
+        index = self._index
+        return intersection_boxes(self.coords,
+                                  [(index.get(id1), index.get(id2)) for id1, id2 in pairs],
+                                  centroids)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Detection Configuration
+Loads extension defaults from config.json
+"""
+
+import os
+import json
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'config.json')
+
+# Revit internal units are feet
+MM_PER_FOOT = 304.8
+
+
+def load_config(path=None):
+    """Load the clash_detection_config section of config.json"""
+    try:
+        with open(path or CONFIG_PATH) as f:
+            return json.load(f).get('clash_detection_config', {})
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def get_option(config, dotted_key, default=None):
+    """Read a nested option such as 'performance.cache_geometry'"""
+    value = config
+    for key in dotted_key.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value
+
+
+class ClashMatrix:
+    """Which category pairs are checked against each other
+
+    Categories come from the enabled groups in config.json. The optional
+    clash_matrix list holds [group, group] pairs; without it every enabled
+    group is checked against every other and against itself.
+    """
+
+    def __init__(self, config):
+        self.groups = {}
+        for group, settings in config.get('categories', {}).items():
+            if settings.get('enabled', True):
+                for category in settings.get('items', []):
+                    self.groups[category] = group
+
+        matrix = config.get('clash_matrix')
+        if matrix is None:
+            names = set(self.groups.values())
+            matrix = [(a, b) for a in names for b in names]
+        self.pairs = set()
+        for a, b in matrix:
+            self.pairs.add((a, b))
+            self.pairs.add((b, a))
+
+    def category_enabled(self, category):
+        """Check if a category name takes part in detection"""
+        return category in self.groups
+
+    def allows(self, category1, category2):
+        """Check if two category names should be tested against each other"""
+        group1 = self.groups.get(category1)
+        group2 = self.groups.get(category2)
+        return group1 is not None and group2 is not None and (group1, group2) in self.pairs
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Progressive Clash Estimation
+Estimates how many candidate pairs are real clashes from a stratified
+random sample of them, with confidence bounds that tighten as more pairs
+are checked. Strata are typically (level, category pair), which also
+gives a heat map of where the clashes are.
+
+Pure Python (IronPython 2.7 and CPython 3), no Revit API imports.
+"""
+
+import random
+from math import sqrt
+from operator import itemgetter
+
+# Two-sided normal quantiles for the supported confidence levels
+CONFIDENCE_Z = {0.8: 1.282, 0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+
+def z_score(confidence):
+    """Normal quantile of the supported confidence level closest to confidence"""
+    level = min(CONFIDENCE_Z, key=lambda known: abs(known - confidence))
+    return CONFIDENCE_Z[level]
+
+
+def sampling_order(items, stratum_of, seed=None, minimum=2):
+    """Items in an order where every prefix is a stratified random sample
+
+    The first `minimum` items of each stratum come first, so each stratum
+    gets a variance estimate early; after that strata are interleaved in
+    proportion to their size.
+    """
+    rng = random.Random(seed)
+    strata = {}
+    for item in items:
+        strata.setdefault(stratum_of(item), []).append(item)
+
+    ranked = []
+    for key in sorted(strata):
+        members = strata[key]
+        rng.shuffle(members)
+        size = float(len(members))
+        for i, item in enumerate(members):
+            if i < minimum:
+                rank = i - minimum + rng.random() * 0.5
+            else:
+                rank = (i + rng.random()) / size
+            ranked.append((rank, item))
+    ranked.sort(key=itemgetter(0))
+    return [item for _, item in ranked]
+
+
+class ProgressiveEstimate:
+    """Stratified estimate of the clash count among candidate pairs
+
+    strata maps each stratum key to its number of candidate pairs.
+    Call record() as pairs are checked; estimates can be read at any
+    time and become exact once every pair has been recorded.
+    """
+
+    def __init__(self, strata, z=1.96):
+        self.z = z
+        self.population = dict(strata)
+        self.checked = dict((key, 0) for key in strata)
+        self.hits = dict((key, 0) for key in strata)
+
+    @property
+    def sampled(self):
+        return sum(self.checked.values())
+
+    @property
+    def total(self):
+        return sum(self.population.values())
+
+    def record(self, key, clashed):
+        """Add the outcome of one checked pair"""
+        self.checked[key] += 1
+        if clashed:
+            self.hits[key] += 1
+
+    def estimate(self, keys=None):
+        """(count, low, high) over the given strata, default all"""
+        keys = list(self.population) if keys is None else list(keys)
+        sampled = sum(self.checked.values())
+        pooled = sum(self.hits.values()) / float(sampled) if sampled else 0.5
+
+        count = variance = 0.0
+        found = misses = 0
+        for key in keys:
+            population = self.population[key]
+            checked = self.checked[key]
+            hits = self.hits[key]
+            found += hits
+            misses += checked - hits
+            if checked >= population:
+                count += hits
+                continue
+            # Unchecked pairs follow the stratum rate, or the overall rate
+            # before the stratum has been sampled
+            rate = hits / float(checked) if checked else pooled
+            count += hits + (population - checked) * rate
+            # Adjusted rate keeps the bound open when no clash was seen yet
+            adjusted = (hits + 1.0) / (checked + 2.0)
+            variance += (population * population * (1.0 - checked / float(population)) *
+                         adjusted * (1.0 - adjusted) / max(checked, 1))
+
+        margin = self.z * sqrt(variance)
+        total = sum(self.population[key] for key in keys)
+        return (count, max(found, count - margin), min(total - misses, count + margin))
+
+    def heat_map(self, group=None):
+        """{group: (count, low, high)}, grouping stratum keys by group(key)"""
+        groups = {}
+        for key in self.population:
+            groups.setdefault(group(key) if group else key, []).append(key)
+        return dict((name, self.estimate(keys)) for name, keys in groups.items())
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Fingerprints and Status Tracking
+Gives each clash a stable identity across runs and matches new results
+against stored history with hash lookups, marking every clash New,
+Active, Resolved or Reintroduced. Matching is linear in the size of the
+run plus the history.
+
+Pure Python (IronPython 2.7 and CPython 3), no Revit API imports.
+"""
+
+import io
+import os
+import json
+import hashlib
+from math import floor
+
+STATUS_NEW = 'New'
+STATUS_ACTIVE = 'Active'
+STATUS_RESOLVED = 'Resolved'
+STATUS_REINTRODUCED = 'Reintroduced'
+
+_OPEN_STATUSES = (STATUS_NEW, STATUS_ACTIVE, STATUS_REINTRODUCED)
+
+
+def pair_key(unique_id1, unique_id2, category1, category2):
+    """Order-independent key of an element pair"""
+    if unique_id2 < unique_id1:
+        unique_id1, unique_id2 = unique_id2, unique_id1
+        category1, category2 = category2, category1
+    return u'{}|{}|{}|{}'.format(unique_id1, unique_id2, category1, category2)
+
+
+def clash_fingerprint(key, point, quantum=1.0):
+    """Fingerprint of a pair key plus the clash location snapped to a grid
+
+    Small shifts of the clash point keep the same fingerprint; moving an
+    element further than quantum gives a new one.
+    """
+    cell = ','.join(str(int(floor(c / quantum))) for c in point) if point else '-'
+    text = u'{}@{}'.format(key, cell).encode('utf-8')
+    return hashlib.sha1(text).hexdigest()[:20]
+
+
+def _runs_path(path):
+    return os.path.splitext(path)[0] + '.runs.json'
+
+
+class ClashHistory:
+    """Fingerprint -> [pair key, status, first seen, last seen], plus run log"""
+
+    def __init__(self, entries=None, runs=None):
+        self.entries = entries or {}
+        self.runs = runs or []
+        # Pair key -> fingerprints, for clashes whose location moved
+        self._by_pair = {}
+        for fingerprint, entry in self.entries.items():
+            self._by_pair.setdefault(entry[0], set()).add(fingerprint)
+
+    @classmethod
+    def load(cls, path):
+        """Load history from a JSON file, or start empty"""
+        entries = None
+        if os.path.exists(path):
+            with io.open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        return cls(entries, cls.load_runs(path))
+
+    @staticmethod
+    def load_runs(path):
+        """Load only the run log, kept beside the much larger entry file"""
+        runs_path = _runs_path(path)
+        if not os.path.exists(runs_path):
+            return []
+        with io.open(runs_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, path):
+        """Write entries and run log as JSON files"""
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        for target, value in ((path, self.entries), (_runs_path(path), self.runs)):
+            with io.open(target, 'w', encoding='utf-8') as f:
+                f.write(u'{}'.format(json.dumps(value, separators=(',', ':'))))
+
+    def match(self, items, run_date):
+        """Match one run's (fingerprint, pair key) items against history
+
+        Returns the status of each item, in order, and a summary of counts.
+        History is updated in place: matched clashes take the new
+        fingerprint, open clashes missing from the run become Resolved.
+        """
+        seen = set()
+        statuses = []
+        for fingerprint, key in items:
+            if fingerprint in seen:
+                # Duplicate of a clash already matched in this run
+                statuses.append(self.entries[fingerprint][1])
+                continue
+            entry = self.entries.get(fingerprint)
+            if entry is None:
+                fingerprint, entry = self._match_moved(fingerprint, key, seen)
+
+            if entry is None:
+                status = STATUS_NEW
+                entry = [key, status, run_date, run_date]
+                self.entries[fingerprint] = entry
+                self._by_pair.setdefault(key, set()).add(fingerprint)
+            elif entry[1] == STATUS_RESOLVED:
+                status = STATUS_REINTRODUCED
+            else:
+                status = STATUS_ACTIVE
+
+            entry[1] = status
+            entry[3] = run_date
+            seen.add(fingerprint)
+            statuses.append(status)
+
+        resolved = 0
+        for fingerprint, entry in self.entries.items():
+            if fingerprint not in seen and entry[1] in _OPEN_STATUSES:
+                entry[1] = STATUS_RESOLVED
+                resolved += 1
+
+        summary = {
+            'new': statuses.count(STATUS_NEW),
+            'active': statuses.count(STATUS_ACTIVE),
+            'reintroduced': statuses.count(STATUS_REINTRODUCED),
+            'resolved': resolved
+        }
+        return statuses, summary
+
+    def _match_moved(self, fingerprint, key, seen):
+        """Same element pair stored under another location, if any"""
+        for old in self._by_pair.get(key, ()):
+            if old not in seen:
+                entry = self.entries.pop(old)
+                self._by_pair[key].discard(old)
+                self._by_pair[key].add(fingerprint)
+                self.entries[fingerprint] = entry
+                return fingerprint, entry
+        return fingerprint, None
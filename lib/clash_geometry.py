@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Geometry Helpers
+Pure-Python bounding box and mesh helpers shared by the Revit tools
+and the headless workers. No Revit API imports here.
+
+Boxes are (min_x, min_y, min_z, max_x, max_y, max_z) tuples.
+Meshes are a vertex list of (x, y, z) tuples plus a triangle list
+of (i, j, k) vertex index tuples.
+"""
+
+from array import array
+
+
+def box_from_points(vertices):
+    """Axis-aligned bounding box of a point list"""
+    if not vertices:
+        return None
+    xs = [v[0] for v in vertices]
+    ys = [v[1] for v in vertices]
+    zs = [v[2] for v in vertices]
+    return (min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+
+
+def boxes_intersect(box1, box2, tolerance=0.0):
+    """Check if two boxes overlap in all three dimensions"""
+    return (box1[0] <= box2[3] + tolerance and box1[3] >= box2[0] - tolerance and
+            box1[1] <= box2[4] + tolerance and box1[4] >= box2[1] - tolerance and
+            box1[2] <= box2[5] + tolerance and box1[5] >= box2[2] - tolerance)
+
+
+def box_intersection(box1, box2):
+    """Intersection box of two boxes, or None when they are disjoint"""
+    result = (max(box1[0], box2[0]), max(box1[1], box2[1]), max(box1[2], box2[2]),
+              min(box1[3], box2[3]), min(box1[4], box2[4]), min(box1[5], box2[5]))
+    if result[0] > result[3] or result[1] > result[4] or result[2] > result[5]:
+        return None
+    return result
+
+
+def box_volume(box):
+    """Volume of a box"""
+    return (box[3] - box[0]) * (box[4] - box[1]) * (box[5] - box[2])
+
+
+def box_mesh(box):
+    """Closed triangle mesh of a box, mainly for benchmarks and fallbacks"""
+    x0, y0, z0, x1, y1, z1 = box
+    vertices = [(x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0),
+                (x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)]
+    triangles = [(0, 2, 1), (0, 3, 2), (4, 5, 6), (4, 6, 7),
+                 (0, 1, 5), (0, 5, 4), (1, 2, 6), (1, 6, 5),
+                 (2, 3, 7), (2, 7, 6), (3, 0, 4), (3, 4, 7)]
+    return vertices, triangles
+
+
+class ClashBoxes:
+    """Intersection boxes of many clash pairs, as flat arrays
+
+    boxes holds six doubles per clash, centers and extents three, and
+    ratios one: the intersection volume over the smaller box volume.
+    Pairs whose boxes only touch within tolerance get zero extents.
+    known is 1 for pairs whose boxes were available, 0 for placeholders.
+    """
+
+    def __init__(self, count):
+        self.boxes = array('d', [0.0]) * (6 * count)
+        self.centers = array('d', [0.0]) * (3 * count)
+        self.extents = array('d', [0.0]) * (3 * count)
+        self.ratios = array('d', [0.0]) * count
+        self.known = bytearray(count)
+
+    def __len__(self):
+        return len(self.ratios)
+
+    def box(self, n):
+        return tuple(self.boxes[6 * n:6 * n + 6])
+
+    def center(self, n):
+        return tuple(self.centers[3 * n:3 * n + 3])
+
+    def refine(self, n, point):
+        """Replace a box center by a better clash point, e.g. a solid centroid"""
+        self.centers[3 * n:3 * n + 3] = array('d', point)
+
+    def extent(self, indices=None):
+        """Box around the intersection boxes of the given clashes, default all
+
+        Pairs without boxes are skipped rather than pulling the extent
+        towards the origin.
+        """
+        indices = range(len(self)) if indices is None else indices
+        boxes = self.boxes
+        known = self.known
+        result = None
+        for n in indices:
+            if not known[n]:
+                continue
+            box = boxes[6 * n:6 * n + 6]
+            if result is None:
+                result = list(box)
+                continue
+            for axis in range(3):
+                result[axis] = min(result[axis], box[axis])
+                result[axis + 3] = max(result[axis + 3], box[axis + 3])
+        return tuple(result) if result else None
+
+
+def intersection_boxes(coords, index_pairs, centroids=None):
+    """ClashBoxes for (row1, row2) pairs of a flat six-per-row coords array
+
+    One pass over the pairs with no per-clash objects; pairs with a row
+    of None are left as zeros. centroids is an optional list aligned with
+    index_pairs of points (or None) that replace the box centers where
+    the true intersection is known.
+    """
+    result = ClashBoxes(len(index_pairs))
+    boxes = result.boxes
+    centers = result.centers
+    extents = result.extents
+    ratios = result.ratios
+    known = result.known
+    for n, (row1, row2) in enumerate(index_pairs):
+        if row1 is None or row2 is None:
+            continue
+        known[n] = 1
+        a = 6 * row1
+        b = 6 * row2
+        o = 6 * n
+        volume = 1.0
+        volume1 = 1.0
+        volume2 = 1.0
+        for axis in range(3):
+            low1, high1 = coords[a + axis], coords[a + axis + 3]
+            low2, high2 = coords[b + axis], coords[b + axis + 3]
+            low = low1 if low1 > low2 else low2
+            high = high1 if high1 < high2 else high2
+            size = high - low if high > low else 0.0
+            if high < low:
+                low = high = (low + high) / 2.0
+            boxes[o + axis] = low
+            boxes[o + axis + 3] = high
+            centers[3 * n + axis] = (low + high) / 2.0
+            extents[3 * n + axis] = size
+            volume *= size
+            volume1 *= high1 - low1
+            volume2 *= high2 - low2
+        smaller = volume1 if volume1 < volume2 else volume2
+        ratios[n] = volume / smaller if smaller > 0 else 0.0
+
+    if centroids:
+        for n, point in enumerate(centroids):
+            if point is not None:
+                result.refine(n, point)
+    return result
+
+
+def find_candidate_pairs(boxes, other_boxes=None, tolerance=0.0):
+    """Sweep-and-prune broad phase over (key, box) lists
+
+    With one list, returns (key1, key2) pairs within it. With other_boxes,
+    returns only cross pairs as (key from boxes, key from other_boxes).
+    """
+    entries = [(box[0] - tolerance, 0, key, box) for key, box in boxes]
+    if other_boxes is not None:
+        entries.extend((box[0] - tolerance, 1, key, box) for key, box in other_boxes)
+    entries.sort(key=lambda entry: entry[0])
+
+    pairs = []
+    active = []
+    for entry in entries:
+        start, group, key, box = entry
+        active = [other for other in active if other[3][3] + tolerance >= start]
+        for other in active:
+            if other_boxes is not None and other[1] == group:
+                continue
+            if boxes_intersect(other[3], box, tolerance):
+                if group == 1:
+                    pairs.append((other[2], key))
+                elif other_boxes is not None:
+                    pairs.append((key, other[2]))
+                else:
+                    pairs.append((other[2], key))
+        active.append(entry)
+    return pairs
+
+
+def _sub(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2])
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1],
+            a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0])
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def triangles_intersect(tri1, tri2, epsilon=1e-9):
+    """Separating axis test for two triangles given as three points each
+
+    Triangles that only touch, including coplanar overlaps, do not count
+    as intersecting.
+    """
+    edges1 = (_sub(tri1[1], tri1[0]), _sub(tri1[2], tri1[1]), _sub(tri1[0], tri1[2]))
+    edges2 = (_sub(tri2[1], tri2[0]), _sub(tri2[2], tri2[1]), _sub(tri2[0], tri2[2]))
+    axes = [_cross(edges1[0], edges1[1]), _cross(edges2[0], edges2[1])]
+    axes.extend(_cross(e1, e2) for e1 in edges1 for e2 in edges2)
+
+    for axis in axes:
+        length_sq = _dot(axis, axis)
+        if length_sq < 1e-18:
+            continue
+        margin = epsilon * length_sq ** 0.5
+        p1 = [_dot(axis, point) for point in tri1]
+        p2 = [_dot(axis, point) for point in tri2]
+        if max(p1) <= min(p2) + margin or max(p2) <= min(p1) + margin:
+            return False
+    return True
+
+
+def point_in_mesh(point, vertices, triangles):
+    """Even-odd test of a point against a closed mesh, casting a ray along +X"""
+    # Offsets keep the ray off shared edges
+    y = point[1] + 1.31e-7
+    z = point[2] + 2.17e-7
+    inside = False
+    for a, b, c in triangles:
+        p1, p2, p3 = vertices[a], vertices[b], vertices[c]
+        det = (p2[1] - p1[1]) * (p3[2] - p1[2]) - (p3[1] - p1[1]) * (p2[2] - p1[2])
+        if abs(det) < 1e-12:
+            continue
+        u = ((y - p1[1]) * (p3[2] - p1[2]) - (p3[1] - p1[1]) * (z - p1[2])) / det
+        v = ((p2[1] - p1[1]) * (z - p1[2]) - (y - p1[1]) * (p2[2] - p1[2])) / det
+        if u < 0 or v < 0 or u + v > 1:
+            continue
+        if p1[0] + u * (p2[0] - p1[0]) + v * (p3[0] - p1[0]) > point[0]:
+            inside = not inside
+    return inside
+
+
+def meshes_intersect(mesh1, mesh2, region=None):
+    """Check if two closed meshes interpenetrate
+
+    Only triangles overlapping the region box (usually the intersection
+    of the two element boxes) are tested. Falls back to a containment
+    test when no surfaces cross.
+    """
+    vertices1, triangles1 = mesh1
+    vertices2, triangles2 = mesh2
+    if not triangles1 or not triangles2:
+        return False
+
+    def clipped(vertices, triangles):
+        result = []
+        for triangle in triangles:
+            points = [vertices[i] for i in triangle]
+            box = box_from_points(points)
+            if region is None or boxes_intersect(box, region):
+                result.append((points, box))
+        return result
+
+    candidates1 = clipped(vertices1, triangles1)
+    candidates2 = clipped(vertices2, triangles2)
+    for points1, box1 in candidates1:
+        for points2, box2 in candidates2:
+            if boxes_intersect(box1, box2) and triangles_intersect(points1, points2):
+                return True
+
+    return (point_in_mesh(vertices1[triangles1[0][0]], vertices2, triangles2) or
+            point_in_mesh(vertices2[triangles2[0][0]], vertices1, triangles1))
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Thumbnails
+Small software rasterizer that draws clash thumbnails straight from
+triangle meshes, without exporting Revit views. The view is an
+orthographic isometric framed on the intersection box; the two clashing
+elements are drawn in contrasting colors over faded context geometry,
+and images are encoded as PNG.
+
+Pure Python (IronPython 2.7 and CPython 3), no Revit API imports.
+"""
+
+import zlib
+import base64
+import struct
+from math import ceil, floor, sqrt
+
+from clash_geometry import box_intersection, find_candidate_pairs
+
+THUMBNAIL_SIZE = (200, 150)
+
+# Looking down at the model from the south-east
+VIEW_DIRECTION = (-1.0, 1.0, -0.8)
+LIGHT_DIRECTION = (0.3, -0.5, 0.8)
+
+BACKGROUND = (255, 255, 255)
+ELEMENT1_COLOR = (220, 60, 50)
+ELEMENT2_COLOR = (40, 110, 210)
+CONTEXT_COLOR = (150, 150, 150)
+OUTLINE_COLOR = (40, 40, 40)
+# Opacity of context geometry drawn over the clashing elements
+CONTEXT_ALPHA = 0.25
+
+# Frame margin around the intersection box, in feet
+MIN_MARGIN = 1.0
+
+# Most context elements drawn around one clash
+MAX_CONTEXT = 12
+
+
+def _normalize(vector):
+    length = sqrt(sum(c * c for c in vector)) or 1.0
+    return tuple(c / length for c in vector)
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+class Camera:
+    """Orthographic camera fitting a box into a width x height image"""
+
+    def __init__(self, box, width, height, direction=VIEW_DIRECTION):
+        self.width = width
+        self.height = height
+        self.center = ((box[0] + box[3]) / 2.0, (box[1] + box[4]) / 2.0, (box[2] + box[5]) / 2.0)
+        self.forward = _normalize(direction)
+        self.right = _normalize(_cross(self.forward, (0.0, 0.0, 1.0)))
+        self.up = _cross(self.right, self.forward)
+
+        xs = []
+        ys = []
+        for x in (box[0], box[3]):
+            for y in (box[1], box[4]):
+                for z in (box[2], box[5]):
+                    u, v, _ = self._view((x, y, z))
+                    xs.append(u)
+                    ys.append(v)
+        span = max(max(xs) - min(xs), 1e-9), max(max(ys) - min(ys), 1e-9)
+        self.scale = min(width / span[0], height / span[1])
+
+    def _view(self, point):
+        d = (point[0] - self.center[0], point[1] - self.center[1], point[2] - self.center[2])
+        return (d[0] * self.right[0] + d[1] * self.right[1] + d[2] * self.right[2],
+                d[0] * self.up[0] + d[1] * self.up[1] + d[2] * self.up[2],
+                d[0] * self.forward[0] + d[1] * self.forward[1] + d[2] * self.forward[2])
+
+    def project(self, point):
+        """(pixel x, pixel y, depth) of a model point"""
+        u, v, depth = self._view(point)
+        return (self.width / 2.0 + u * self.scale, self.height / 2.0 - v * self.scale, depth)
+
+
+class Raster:
+    """RGB image with a depth buffer"""
+
+    def __init__(self, width, height, background=BACKGROUND):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(background * (width * height))
+        self.depth = [float('inf')] * (width * height)
+
+    def draw_mesh(self, camera, mesh, color, alpha=1.0):
+        """Draw a (vertices, triangles) mesh with flat shading
+
+        Opaque meshes write depth; translucent ones blend over whatever
+        is behind them and leave depth untouched.
+        """
+        vertices, triangles = mesh
+        light = _normalize(LIGHT_DIRECTION)
+        projected = [camera.project(vertex) for vertex in vertices]
+        for i, j, k in triangles:
+            a, b, c = vertices[i], vertices[j], vertices[k]
+            normal = _normalize(_cross((b[0] - a[0], b[1] - a[1], b[2] - a[2]),
+                                       (c[0] - a[0], c[1] - a[1], c[2] - a[2])))
+            shade = 0.45 + 0.55 * abs(normal[0] * light[0] + normal[1] * light[1] +
+                                      normal[2] * light[2])
+            self._fill(projected[i], projected[j], projected[k],
+                       tuple(int(channel * shade) for channel in color), alpha)
+
+    def _fill(self, p0, p1, p2, color, alpha):
+        area = (p1[0] - p0[0]) * (p2[1] - p0[1]) - (p1[1] - p0[1]) * (p2[0] - p0[0])
+        if abs(area) < 1e-12:
+            return
+        y0 = max(int(min(p0[1], p1[1], p2[1])), 0)
+        y1 = min(int(max(p0[1], p1[1], p2[1])) + 1, self.height)
+        left = max(min(p0[0], p1[0], p2[0]), 0.0)
+        right = min(max(p0[0], p1[0], p2[0]), self.width - 0.5)
+        if y0 >= y1 or left > right:
+            return
+
+        # Barycentric weights and depth are linear in x along a row
+        edges = []
+        for a, b in ((p1, p2), (p2, p0)):
+            edges.append(((a[1] - b[1]) / area, (b[0] - a[0]) / area,
+                          (a[0] * b[1] - a[1] * b[0]) / area))
+        dzdx = edges[0][0] * (p0[2] - p2[2]) + edges[1][0] * (p1[2] - p2[2])
+        dzdy = edges[0][1] * (p0[2] - p2[2]) + edges[1][1] * (p1[2] - p2[2])
+        z00 = p2[2] + edges[0][2] * (p0[2] - p2[2]) + edges[1][2] * (p1[2] - p2[2])
+        # Third weight is 1 - w0 - w1
+        edges.append((-edges[0][0] - edges[1][0], -edges[0][1] - edges[1][1],
+                      1.0 - edges[0][2] - edges[1][2]))
+
+        pixels = self.pixels
+        depth = self.depth
+        width = self.width
+        opaque = alpha >= 1.0
+        fill = bytearray(color)
+        for y in range(y0, y1):
+            py = y + 0.5
+            start, end = left, right
+            for dx, dy, c in edges:
+                value = dy * py + c
+                if abs(dx) < 1e-15:
+                    if value < 0:
+                        start, end = 1.0, 0.0
+                elif dx > 0:
+                    start = max(start, -value / dx)
+                else:
+                    end = min(end, -value / dx)
+            # Pixels whose centers fall inside the span
+            x0 = max(int(ceil(start - 0.5)), 0)
+            x1 = min(int(floor(end - 0.5)), width - 1)
+            if x0 > x1:
+                continue
+            row = y * width
+            z = z00 + dzdy * py + dzdx * (x0 + 0.5)
+            for index in range(row + x0, row + x1 + 1):
+                if z < depth[index]:
+                    offset = 3 * index
+                    if opaque:
+                        depth[index] = z
+                        pixels[offset:offset + 3] = fill
+                    else:
+                        for channel in range(3):
+                            pixels[offset + channel] = int(pixels[offset + channel] * (1.0 - alpha) +
+                                                           color[channel] * alpha)
+                z += dzdx
+
+    def draw_box(self, camera, box, color=OUTLINE_COLOR):
+        """Outline the edges of a box, ignoring depth"""
+        corners = [camera.project((x, y, z)) for x in (box[0], box[3])
+                   for y in (box[1], box[4]) for z in (box[2], box[5])]
+        for i in range(8):
+            for bit in (1, 2, 4):
+                if not i & bit:
+                    self._line(corners[i], corners[i | bit], color)
+
+    def _line(self, start, end, color):
+        steps = int(max(abs(end[0] - start[0]), abs(end[1] - start[1]))) + 1
+        for step in range(steps + 1):
+            t = step / float(steps)
+            x = int(start[0] + (end[0] - start[0]) * t)
+            y = int(start[1] + (end[1] - start[1]) * t)
+            if 0 <= x < self.width and 0 <= y < self.height:
+                offset = 3 * (y * self.width + x)
+                self.pixels[offset:offset + 3] = bytearray(color)
+
+    def to_png(self):
+        """Encode the image as PNG bytes"""
+        stride = 3 * self.width
+        rows = bytearray()
+        for y in range(self.height):
+            rows.append(0)
+            rows.extend(self.pixels[y * stride:(y + 1) * stride])
+
+        def chunk(tag, data):
+            body = tag + bytes(data)
+            return (struct.pack('>I', len(data)) + body +
+                    struct.pack('>I', zlib.crc32(body) & 0xffffffff))
+
+        header = struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0)
+        return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+                chunk(b'IDAT', zlib.compress(bytes(rows))) + chunk(b'IEND', b''))
+
+
+def frame_box(box1, box2):
+    """Intersection of two element boxes grown by a margin for framing"""
+    region = box_intersection(box1, box2) or (
+        max(box1[0], box2[0]), max(box1[1], box2[1]), max(box1[2], box2[2]),
+        max(box1[0], box2[0]), max(box1[1], box2[1]), max(box1[2], box2[2]))
+    size = max(region[3] - region[0], region[4] - region[1], region[5] - region[2])
+    margin = max(size, MIN_MARGIN)
+    return (region[0] - margin, region[1] - margin, region[2] - margin,
+            region[3] + margin, region[4] + margin, region[5] + margin), region
+
+
+def context_elements(clashes, items, limit=MAX_CONTEXT):
+    """Ids of elements around each clash, drawn faded for context
+
+    clashes is a list of (id1, box1, id2, box2) and items the (id, box)
+    of elements that may appear around them. One sweep finds the context
+    of every clash.
+    """
+    frames = [(n, frame_box(box1, box2)[0]) for n, (_, box1, _, box2) in enumerate(clashes)]
+    context = [[] for _ in clashes]
+    for n, element_id in find_candidate_pairs(frames, items):
+        clash = clashes[n]
+        if element_id != clash[0] and element_id != clash[2] and len(context[n]) < limit:
+            context[n].append(element_id)
+    return context
+
+
+def render_clash(job):
+    """PNG thumbnail of one clash
+
+    job is (mesh1, mesh2, box1, box2, context meshes, (width, height)).
+    """
+    mesh1, mesh2, box1, box2, context, size = job
+    frame, region = frame_box(box1, box2)
+    camera = Camera(frame, size[0], size[1])
+    raster = Raster(size[0], size[1])
+    raster.draw_mesh(camera, mesh1, ELEMENT1_COLOR)
+    raster.draw_mesh(camera, mesh2, ELEMENT2_COLOR)
+    for mesh in context:
+        raster.draw_mesh(camera, mesh, CONTEXT_COLOR, CONTEXT_ALPHA)
+    raster.draw_box(camera, region)
+    return raster.to_png()
+
+
+def data_uri(png):
+    """PNG bytes as a data URI for embedding in HTML"""
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
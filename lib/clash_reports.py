@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Report Writers
+Writes clash records to CSV, HTML and JSON. Records are plain dicts,
+so reports can be produced inside Revit or by the headless batch runner.
+"""
+
+import io
+import sys
+import csv
+import json
+from datetime import datetime
+
+# (CSV column, record key)
+CSV_COLUMNS = [
+    ('Element1_Id', 'element1_id'),
+    ('Element1_Name', 'element1_name'),
+    ('Element1_Category', 'element1_category'),
+    ('Element2_Id', 'element2_id'),
+    ('Element2_Name', 'element2_name'),
+    ('Element2_Category', 'element2_category'),
+    ('Clash_Volume', 'volume'),
+    ('Level', 'level'),
+    ('Status', 'status'),
+    ('Clash_X', 'x'),
+    ('Clash_Y', 'y'),
+    ('Clash_Z', 'z'),
+    ('Overlap_Ratio', 'overlap_ratio')
+]
+
+REPORT_FORMATS = ['CSV', 'HTML', 'JSON']
+
+_HTML_HEAD = """
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Clash Detection Report</title>
+        <style>
+            body { font-family: Arial, sans-serif; margin: 20px; }
+            h1 { color: #333; }
+            table { border-collapse: collapse; width: 100%; }
+            th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+            th { background-color: #4CAF50; color: white; }
+            tr:nth-child(even) { background-color: #f2f2f2; }
+            .summary { background-color: #e7f3fe; padding: 15px; margin-bottom: 20px; }
+        </style>
+    </head>
+"""
+
+_HTML_SUMMARY = """
+    <body>
+        <h1>Clash Detection Report</h1>
+        <div class="summary">
+            <h2>Summary</h2>
+            <p>Project: {}</p>
+            <p>Date: {}</p>
+            <p>Total Clashes: {}</p>
+        </div>
+        <table>
+            <tr>
+                <th>#</th>
+                <th>Element 1</th>
+                <th>Category 1</th>
+                <th>Element 2</th>
+                <th>Category 2</th>
+                <th>Status</th>{}
+            </tr>
+"""
+
+_HTML_ROW = """
+            <tr>
+                <td>{}</td>
+                <td>{}</td>
+                <td>{}</td>
+                <td>{}</td>
+                <td>{}</td>
+                <td>{}</td>{}
+            </tr>
+"""
+
+_HTML_VIEW_HEADER = """
+                <th>View</th>"""
+
+_HTML_VIEW_CELL = """
+                <td><img src="{}" alt="Clash {}"/></td>"""
+
+_HTML_EMPTY_CELL = """
+                <td></td>"""
+
+_HTML_TAIL = """
+        </table>
+    </body>
+    </html>
+"""
+
+
+def clash_record(clash):
+    """Flatten a detection clash dict holding Revit elements into a report record"""
+    elem1 = clash['elem1']
+    elem2 = clash['elem2']
+    return {
+        'element1_id': elem1.Id.IntegerValue,
+        'element1_name': elem1.Name,
+        'element1_category': elem1.Category.Name if elem1.Category else '',
+        'element2_id': elem2.Id.IntegerValue,
+        'element2_name': elem2.Name,
+        'element2_category': elem2.Category.Name if elem2.Category else '',
+        'volume': clash.get('volume', 'N/A'),
+        'level': clash.get('level', 'N/A'),
+        'status': clash.get('status', 'New')
+    }
+
+
+def add_location(record, point, overlap_ratio):
+    """Add the clash point (model units) and box overlap ratio to a record"""
+    record['x'], record['y'], record['z'] = [round(value, 4) for value in point]
+    record['overlap_ratio'] = round(overlap_ratio, 4)
+    return record
+
+
+class ClashResultSet:
+    """Clashes from one detection run, plus how they were produced"""
+
+    def __init__(self, clashes, method='Standard', categories=None, created=None):
+        self.clashes = list(clashes)
+        self.method = method
+        self.categories = categories or []
+        self.created = created or datetime.now().strftime("%Y-%m-%d %H:%M")
+        # Set when the document changes after the run
+        self.stale = False
+        # ClashBoxes aligned with clashes, filled in by the session
+        self.boxes = None
+
+    def __len__(self):
+        return len(self.clashes)
+
+    def __iter__(self):
+        return iter(self.clashes)
+
+    def drop_invalid(self):
+        """Remove clashes involving deleted elements, returning how many
+
+        Boxes are aligned with the clashes, so they are dropped too and
+        recomputed on next use.
+        """
+        kept = [clash for clash in self.clashes
+                if clash['elem1'].IsValidObject and clash['elem2'].IsValidObject]
+        dropped = len(self.clashes) - len(kept)
+        if dropped:
+            self.clashes = kept
+            self.boxes = None
+        return dropped
+
+    def element_ids(self):
+        """Ids of every element involved in a clash"""
+        ids = []
+        seen = set()
+        for clash in self.clashes:
+            for element in (clash['elem1'], clash['elem2']):
+                if element.Id.IntegerValue not in seen:
+                    seen.add(element.Id.IntegerValue)
+                    ids.append(element.Id)
+        return ids
+
+    def records(self):
+        """Report records for every clash, with locations once boxes are known"""
+        records = [clash_record(clash) for clash in self.clashes]
+        if self.boxes is not None:
+            for n, record in enumerate(records):
+                add_location(record, self.boxes.center(n), self.boxes.ratios[n])
+        return records
+
+
+def _escape(value):
+    return (u'{}'.format(value).replace('&', '&amp;')
+            .replace('<', '&lt;').replace('>', '&gt;'))
+
+
+def export_to_csv(records, filepath):
+    """Export clash records to CSV format"""
+    if sys.version_info[0] < 3:
+        csvfile = open(filepath, 'wb')
+    else:
+        csvfile = open(filepath, 'w', newline='')
+    with csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Index'] + [column for column, _ in CSV_COLUMNS])
+        for i, record in enumerate(records, 1):
+            writer.writerow([i] + [record.get(key, 'N/A') for _, key in CSV_COLUMNS])
+
+
+def export_to_html(records, filepath, project=''):
+    """Export clash records to HTML format
+
+    Records with a 'thumbnail' data URI get an embedded clash image.
+    """
+    views = any(record.get('thumbnail') for record in records)
+    parts = [_HTML_HEAD, _HTML_SUMMARY.format(
+        _escape(project), datetime.now().strftime("%Y-%m-%d %H:%M"), len(records),
+        _HTML_VIEW_HEADER if views else '')]
+    for i, record in enumerate(records, 1):
+        view = ''
+        if record.get('thumbnail'):
+            view = _HTML_VIEW_CELL.format(record['thumbnail'], i)
+        elif views:
+            view = _HTML_EMPTY_CELL
+        parts.append(_HTML_ROW.format(
+            i,
+            _escape(record.get('element1_name', '')),
+            _escape(record.get('element1_category', '')),
+            _escape(record.get('element2_name', '')),
+            _escape(record.get('element2_category', '')),
+            _escape(record.get('status', 'New')),
+            view))
+    parts.append(_HTML_TAIL)
+
+    with io.open(filepath, 'w', encoding='utf-8') as f:
+        f.write(u''.join(parts))
+
+
+def export_to_json(records, filepath):
+    """Export clash records to JSON format, leaving out thumbnails"""
+    records = [dict((key, value) for key, value in record.items() if key != 'thumbnail')
+               for record in records]
+    with open(filepath, 'w') as f:
+        json.dump(records, f, indent=4, default=str)
+
+
+def export_report(records, filepath, report_format, project=''):
+    """Export clash records in one of REPORT_FORMATS"""
+    if report_format == 'CSV':
+        export_to_csv(records, filepath)
+    elif report_format == 'HTML':
+        export_to_html(records, filepath, project)
+    elif report_format == 'JSON':
+        export_to_json(records, filepath)
+    else:
+        raise ValueError("Unknown report format: {}".format(report_format))
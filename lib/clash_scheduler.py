@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Time-Sliced Job Scheduling
+Breaks long work into resumable phases of small batches and runs them in
+bounded time slices, so a host event loop (Revit Idling or an external
+event) stays responsive between slices.
+
+The core knows nothing about Revit: the clock is injectable and a slice
+is just a method call, so jobs can be driven by a simulated event loop.
+Pure Python (IronPython 2.7 and CPython 3).
+"""
+
+import time
+
+
+class Phase:
+    """A named list of work items processed in batches
+
+    items may be a list or a callable returning one; callables are
+    evaluated when the phase starts, so a phase can depend on the
+    output of earlier phases. handler receives one batch (a list).
+    """
+
+    def __init__(self, name, items, handler, batch_size=1):
+        self.name = name
+        self.items = items
+        self.handler = handler
+        self.batch_size = batch_size
+
+
+class TimeSlicedJob:
+    """Runs phases batch by batch within per-slice time budgets"""
+
+    def __init__(self, phases, clock=time.time):
+        self.phases = phases
+        self.clock = clock
+        self.phase_index = 0
+        self.offset = 0
+        self.cancelled = False
+        self._items = None
+        self._listeners = []
+
+    @property
+    def done(self):
+        return self.cancelled or self.phase_index >= len(self.phases)
+
+    @property
+    def progress(self):
+        """(phase name, items done, items in phase) of the current phase"""
+        if self.done:
+            return ('done', 0, 0)
+        total = len(self._items) if self._items is not None else 0
+        return (self.phases[self.phase_index].name, self.offset, total)
+
+    def add_listener(self, callback):
+        """Call callback(job) after every slice, e.g. to show partial results"""
+        self._listeners.append(callback)
+
+    def run_slice(self, budget=0.05):
+        """Process batches until budget seconds have passed
+
+        At least one batch runs per slice so the job always advances.
+        Returns True while work remains.
+        """
+        start = self.clock()
+        while not self.done:
+            self._run_batch()
+            if self.clock() - start >= budget:
+                break
+        for callback in self._listeners:
+            callback(self)
+        return not self.done
+
+    def run_all(self):
+        """Run to completion without yielding, e.g. for batch use"""
+        while not self.done:
+            self._run_batch()
+        for callback in self._listeners:
+            callback(self)
+
+    def _run_batch(self):
+        phase = self.phases[self.phase_index]
+        if self._items is None:
+            self._items = phase.items() if callable(phase.items) else phase.items
+
+        batch = self._items[self.offset:self.offset + phase.batch_size]
+        if batch:
+            phase.handler(batch)
+            self.offset += len(batch)
+
+        if self.offset >= len(self._items):
+            self.phase_index += 1
+            self.offset = 0
+            self._items = None
+
+    def cancel(self):
+        """Stop after the current batch"""
+        self.cancelled = True
+
+    def checkpoint(self):
+        """Position to resume from after a pause"""
+        return {'phase': self.phase_index, 'offset': self.offset}
+
+    def restore(self, checkpoint):
+        """Resume from a checkpoint taken on this job"""
+        if checkpoint['phase'] != self.phase_index:
+            self._items = None
+        self.phase_index = checkpoint['phase']
+        self.offset = checkpoint['offset']
+        self.cancelled = False
+
+
+class IdlingDriver:
+    """Drives a job from a host Idling event, one slice per callback
+
+    host is anything with an Idling event taking handler(sender, args),
+    such as Revit's UIApplication. While work remains the handler asks the
+    host to call again without delay.
+    """
+
+    def __init__(self, host, job, budget=0.05):
+        self.host = host
+        self.job = job
+        self.budget = budget
+        self.running = False
+        self.checkpoint = None
+        # Keep one handler object so it can be detached again
+        self._handler = self._on_idling
+
+    def start(self):
+        """Attach to the host, resuming from the last pause if any"""
+        if self.running:
+            return
+        if self.checkpoint:
+            self.job.restore(self.checkpoint)
+        self.host.Idling += self._handler
+        self.running = True
+
+    def pause(self):
+        """Detach from the host and remember where the job stopped"""
+        if not self.running:
+            return
+        self.host.Idling -= self._handler
+        self.running = False
+        self.checkpoint = self.job.checkpoint()
+
+    def _on_idling(self, sender, args):
+        if self.job.run_slice(self.budget):
+            args.SetRaiseWithoutDelay()
+        else:
+            self.pause()
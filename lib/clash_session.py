@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Clash Detection Session
+Per-document state shared by every button for the life of the Revit
+session: the detection engine with its geometry caches, bounding box
+tables and the latest ClashResultSet.
+
+pyRevit runs each button in its own script engine, so sessions are kept
+in AppDomain data rather than module globals. The doc-changed and
+doc-closing hooks keep them in step with the model.
+"""
+
+from Autodesk.Revit import DB
+from System import AppDomain
+import os
+import re
+
+from clash_collect import BoundingBoxTable, collect_element_ids, collect_model_element_ids
+from clash_config import MM_PER_FOOT, ClashMatrix, load_config
+from clash_fingerprint import ClashHistory, clash_fingerprint, pair_key
+from clash_reports import ClashResultSet
+from clash_utils import ClashDetectionEngine
+
+# AppDomain slot holding {document key: ClashSession}
+SESSIONS_SLOT = 'ClashDetection.Sessions'
+
+HISTORY_FOLDER = os.path.join(os.getenv('APPDATA') or os.path.expanduser('~'),
+                              'pyRevit', 'ClashDetection')
+
+
+def history_path(doc):
+    """File holding fingerprint history and the run log of a document"""
+    name = re.sub(r'[^\w.-]', '_', doc.Title) or 'untitled'
+    return os.path.join(HISTORY_FOLDER, name + '.json')
+
+
+class ClashSession:
+    """Cached detection state of one open document"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.config = load_config()
+        self.matrix = ClashMatrix(self.config)
+        self.engine = ClashDetectionEngine.from_config(doc, self.config)
+        self.results = None
+        # Integer ids of the elements in results
+        self._result_ids = set()
+        self._model_table = None
+        # View id -> BoundingBoxTable of view-specific boxes
+        self._view_tables = {}
+
+    def model_box_table(self):
+        """Box table of every element in the clash matrix categories"""
+        if self._model_table is None:
+            self._model_table = BoundingBoxTable(
+                self.doc, collect_model_element_ids(self.doc, self.matrix))
+        return self._model_table
+
+    def adopt_box_table(self, table):
+        """Reuse the model box table a detection job already collected"""
+        if self._model_table is None:
+            self._model_table = table
+
+    def view_box_table(self, view, categories):
+        """Box table of elements in a view, using the view's boxes"""
+        key = view.Id.IntegerValue
+        if key not in self._view_tables:
+            element_ids = collect_element_ids(self.doc, categories, view=view)
+            self._view_tables[key] = BoundingBoxTable(self.doc, element_ids, view=view)
+        return self._view_tables[key]
+
+    def set_results(self, clashes, method='Standard', categories=None, track=False):
+        """Store the clashes of a finished run as the latest results
+
+        Whole-model runs should pass track=True to match the clashes
+        against history; partial runs would mark everything else resolved.
+        """
+        self.results = ClashResultSet(clashes, method, categories)
+        self._result_ids = set(element_id.IntegerValue
+                               for element_id in self.results.element_ids())
+        if track:
+            self._track(self.results)
+        return self.results
+
+    def clash_boxes(self):
+        """ClashBoxes of the latest results, computed once per result set
+
+        Centers are refined to the centroid of the intersection solid
+        where detection recorded one. The model box table is used when it
+        has been collected already; otherwise only the clashing elements'
+        boxes are read, so small runs do not collect the whole model.
+        """
+        results = self.results
+        if results.boxes is None:
+            pairs = [(clash['elem1'].Id.IntegerValue, clash['elem2'].Id.IntegerValue)
+                     for clash in results]
+            table = self._model_table
+            if table is None:
+                # clash_boxes fetches the boxes of ids the table lacks
+                table = BoundingBoxTable(self.doc, [])
+            results.boxes = table.clash_boxes(
+                pairs, [clash.get('centroid') for clash in results])
+        return results.boxes
+
+    def _track(self, results):
+        """Fingerprint clashes, set their status and log the run"""
+        quantum = self.config.get('tracking', {}).get('location_quantum_mm', 300) / MM_PER_FOOT
+        boxes = self.clash_boxes()
+        items = []
+        for n, clash in enumerate(results):
+            elem1, elem2 = clash['elem1'], clash['elem2']
+            key = pair_key(elem1.UniqueId, elem2.UniqueId,
+                           elem1.Category.Name if elem1.Category else '',
+                           elem2.Category.Name if elem2.Category else '')
+            clash['fingerprint'] = clash_fingerprint(key, boxes.center(n), quantum)
+            items.append((clash['fingerprint'], key))
+
+        path = history_path(self.doc)
+        history = ClashHistory.load(path)
+        statuses, summary = history.match(items, results.created)
+        for clash, status in zip(results, statuses):
+            clash['status'] = status
+
+        history.runs.append({
+            'date': results.created,
+            'clash_count': len(results) + summary['resolved'],
+            'resolved': summary['resolved'],
+            'new': summary['new'],
+            'reintroduced': summary['reintroduced'],
+            'categories': results.categories,
+            'method': results.method
+        })
+        history.save(path)
+
+    def on_document_changed(self, modified_ids, deleted_ids, added_ids):
+        """Drop state that the change made out of date
+
+        Only edits to elements the session holds state for, and new model
+        elements, count. View-only transactions such as graphic overrides
+        or section boxes leave results and tables alone.
+        """
+        deleted = set(element_id.IntegerValue for element_id in deleted_ids)
+        changed = [element_id.IntegerValue for element_id in modified_ids]
+        changed.extend(deleted)
+        changed = [element_id for element_id in changed if self._is_tracked(element_id)]
+        
+        # Deleted elements cannot be read any more, so their clashes go
+        if deleted & self._result_ids and self.results.drop_invalid():
+            self._result_ids = set(element_id.IntegerValue
+                                   for element_id in self.results.element_ids())
+        
+        added = [self.doc.GetElement(element_id) for element_id in added_ids]
+        added = [element for element in added if _is_model_instance(element)]
+        
+        if changed or any(self.matrix.category_enabled(element.Category.Name)
+                          for element in added):
+            self.engine.clear_cache(changed)
+            self._model_table = None
+            self._view_tables = {}
+            if self.results is not None:
+                self.results.stale = True
+        elif added:
+            # View tables may cover categories outside the clash matrix
+            self._view_tables = {}
+    
+    def _is_tracked(self, element_id):
+        """Whether the session holds boxes, geometry or results for an element"""
+        if element_id in self._result_ids or self.engine.has_cached(element_id):
+            return True
+        if self._model_table is not None and element_id in self._model_table:
+            return True
+        return any(element_id in table for table in self._view_tables.values())
+
+
+def _is_model_instance(element):
+    """True for placed model elements, False for views, types and annotations"""
+    if element is None or element.Category is None or isinstance(element, DB.ElementType):
+        return False
+    return element.Category.CategoryType == DB.CategoryType.Model
+
+def _document_key(doc):
+    return u'{}|{}'.format(doc.Title, doc.PathName)
+
+
+def _sessions():
+    sessions = AppDomain.CurrentDomain.GetData(SESSIONS_SLOT)
+    if sessions is None:
+        sessions = {}
+        AppDomain.CurrentDomain.SetData(SESSIONS_SLOT, sessions)
+    return sessions
+
+
+def get_session(doc):
+    """Session of a document, created on first use"""
+    sessions = _sessions()
+    key = _document_key(doc)
+    if key not in sessions:
+        sessions[key] = ClashSession(doc)
+    return sessions[key]
+
+
+def find_session(doc):
+    """Existing session of a document, or None"""
+    return _sessions().get(_document_key(doc))
+
+
+def close_session(doc):
+    """Forget everything cached for a document"""
+    _sessions().pop(_document_key(doc), None)
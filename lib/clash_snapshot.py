@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Geometry Snapshot Files
+Compact binary store of triangulated element meshes, read by the headless
+batch runner without Revit. Detection inside Revit works on Revit solids
+and does not read snapshots; Export Snapshot only uses the previous file
+to copy unchanged elements when rewriting it.
+
+Layout (little-endian):
+    header    magic, format version, counts and section offsets
+    records   one fixed-size record per element (ids, mesh slices, AABB)
+    vertices  float32 x, y, z for every element, contiguous
+    triangles int32 vertex indices, local to each element's vertex slice
+    strings   UTF-8 JSON with unique ids, version stamps, names, metadata
+
+Readers memory-map the file; on CPython mesh arrays are zero-copy views,
+which add_from copies straight into the next snapshot.
+Pure Python (IronPython 2.7 and CPython 3), no Revit API imports.
+"""
+
+import io
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+from clash_geometry import box_from_points
+
+MAGIC = b'CDSNAP01'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<8sIIIIQQQQ')
+# element id, category id, level id, vertex start, vertex count,
+# triangle start, triangle count, AABB
+_RECORD = struct.Struct('<qqqIIII6f')
+
+_STRING_FIELDS = ('unique_id', 'stamp', 'category', 'level', 'name')
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is missing, truncated or incompatible"""
+    pass
+
+
+def _to_bytes(values):
+    return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+
+class SnapshotWriter:
+    """Accumulates element meshes and writes them as one snapshot file"""
+
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self.metadata = metadata or {}
+        self._records = []
+        self._strings = dict((field, []) for field in _STRING_FIELDS)
+        self._vertices = array('f')
+        self._triangles = array('i')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add(self, element_id, vertices, triangles, box=None, category_id=-1,
+            level_id=-1, unique_id='', stamp='', category='', level='', name=''):
+        """Add one element mesh given as (x, y, z) and (i, j, k) tuples"""
+        flat_vertices = [c for vertex in vertices for c in vertex]
+        flat_triangles = [i for triangle in triangles for i in triangle]
+        self._add_flat(element_id, flat_vertices, flat_triangles,
+                       box or box_from_points(vertices),
+                       category_id, level_id,
+                       (unique_id, stamp, category, level, name))
+
+    def add_from(self, snapshot, element_id):
+        """Copy an unchanged element from an existing snapshot"""
+        info = snapshot.info(element_id)
+        flat_vertices, flat_triangles = snapshot.mesh_arrays(element_id)
+        self._add_flat(element_id, flat_vertices, flat_triangles, info['box'],
+                       info['category_id'], info['level_id'],
+                       [info[field] for field in _STRING_FIELDS])
+
+    def _add_flat(self, element_id, flat_vertices, flat_triangles, box,
+                  category_id, level_id, strings):
+        self._records.append((
+            element_id, category_id, level_id,
+            len(self._vertices) // 3, len(flat_vertices) // 3,
+            len(self._triangles) // 3, len(flat_triangles) // 3,
+            box or (0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        ))
+        self._vertices.extend(flat_vertices)
+        self._triangles.extend(flat_triangles)
+        for field, value in zip(_STRING_FIELDS, strings):
+            self._strings[field].append(value or '')
+
+    def close(self):
+        """Write the snapshot to disk"""
+        records_offset = _HEADER.size
+        vertices_offset = records_offset + _RECORD.size * len(self._records)
+        triangles_offset = vertices_offset + 4 * len(self._vertices)
+        strings_offset = triangles_offset + 4 * len(self._triangles)
+
+        vertices = self._vertices
+        triangles = self._triangles
+        if sys.byteorder != 'little':
+            vertices = array('f', vertices)
+            triangles = array('i', triangles)
+            vertices.byteswap()
+            triangles.byteswap()
+
+        strings = dict(self._strings)
+        strings['metadata'] = self.metadata
+
+        with io.open(self.path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self._records),
+                                 len(self._vertices) // 3, len(self._triangles) // 3,
+                                 records_offset, vertices_offset,
+                                 triangles_offset, strings_offset))
+            for element_id, category_id, level_id, v_start, v_count, t_start, t_count, box in self._records:
+                f.write(_RECORD.pack(element_id, category_id, level_id,
+                                     v_start, v_count, t_start, t_count, *box))
+            # array.tofile needs a built-in file object on Python 2
+            f.write(_to_bytes(vertices))
+            f.write(_to_bytes(triangles))
+            f.write(json.dumps(strings).encode('utf-8'))
+
+
+class GeometrySnapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._vertex_view = None
+        self._triangle_view = None
+        self._file = io.open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            # Empty files cannot be mapped
+            self._data = self._file.read()
+
+        if len(self._data) < _HEADER.size:
+            self.close()
+            raise SnapshotError("Truncated snapshot: {}".format(path))
+        (magic, version, element_count, vertex_count, triangle_count,
+         records_offset, vertices_offset, triangles_offset,
+         strings_offset) = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise SnapshotError("Not a version {} snapshot: {}".format(FORMAT_VERSION, path))
+
+        self._records_offset = records_offset
+        self._vertices_offset = vertices_offset
+        self._triangles_offset = triangles_offset
+        self._vertex_count = vertex_count
+        self._triangle_count = triangle_count
+
+        # Offset index: element id -> record number
+        self._index = {}
+        for n in range(element_count):
+            element_id = struct.unpack_from('<q', self._data, records_offset + n * _RECORD.size)[0]
+            self._index[element_id] = n
+
+        strings = json.loads(self._data[strings_offset:].decode('utf-8'))
+        self.metadata = strings.pop('metadata', {})
+        self._strings = strings
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, element_id):
+        return element_id in self._index
+
+    @property
+    def element_ids(self):
+        """Element ids in file order"""
+        return sorted(self._index, key=self._index.get)
+
+    def _record(self, element_id):
+        return _RECORD.unpack_from(self._data, self._records_offset + self._index[element_id] * _RECORD.size)
+
+    def info(self, element_id):
+        """Ids, names, version stamp and AABB of an element"""
+        record = self._record(element_id)
+        n = self._index[element_id]
+        info = {
+            'element_id': record[0],
+            'category_id': record[1],
+            'level_id': record[2],
+            'box': record[7:13]
+        }
+        for field in _STRING_FIELDS:
+            values = self._strings.get(field)
+            info[field] = values[n] if values else ''
+        return info
+
+    def box(self, element_id):
+        """Axis-aligned bounding box of an element"""
+        return self._record(element_id)[7:13]
+
+    def stamp(self, element_id):
+        """Version stamp recorded when the element was extracted"""
+        return self._strings['stamp'][self._index[element_id]]
+
+    def mesh_arrays(self, element_id):
+        """Flat float32 vertex and int32 triangle arrays of an element
+
+        On CPython these are memoryview slices into the mapped file; other
+        interpreters get array copies of just this element's data.
+        """
+        record = self._record(element_id)
+        v_start, v_count, t_start, t_count = record[3:7]
+        vertices = self._slice('f', self._vertices_offset, 3 * v_start, 3 * v_count)
+        triangles = self._slice('i', self._triangles_offset, 3 * t_start, 3 * t_count)
+        return vertices, triangles
+
+    def mesh(self, element_id):
+        """Element mesh as (x, y, z) vertex and (i, j, k) triangle tuples"""
+        vertices, triangles = self.mesh_arrays(element_id)
+        return (list(zip(vertices[0::3], vertices[1::3], vertices[2::3])),
+                list(zip(triangles[0::3], triangles[1::3], triangles[2::3])))
+
+    def _slice(self, typecode, offset, start, count):
+        if sys.byteorder == 'little' and hasattr(memoryview, 'cast'):
+            if typecode == 'f':
+                if self._vertex_view is None:
+                    self._vertex_view = self._view(typecode, offset, self._vertex_count)
+                return self._vertex_view[start:start + count]
+            if self._triangle_view is None:
+                self._triangle_view = self._view(typecode, offset, self._triangle_count)
+            return self._triangle_view[start:start + count]
+
+        values = array(typecode)
+        begin = offset + 4 * start
+        chunk = self._data[begin:begin + 4 * count]
+        if hasattr(values, 'frombytes'):
+            values.frombytes(chunk)
+        else:
+            values.fromstring(chunk)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+    def _view(self, typecode, offset, count):
+        return memoryview(self._data)[offset:offset + 12 * count].cast(typecode)
+
+    def close(self):
+        """Release the mapping and the file handle"""
+        for view in (self._vertex_view, self._triangle_view):
+            if view is not None:
+                view.release()
+        self._vertex_view = self._triangle_view = None
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:
+                # Slices handed out to callers still reference the mapping
+                pass
+        self._file.close()
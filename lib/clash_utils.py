@@ -6,20 +6,85 @@ Shared utilities for clash detection extension
 
 from Autodesk.Revit import DB
 from math import sqrt
+import time
+
+from clash_collect import BoundingBoxTable
+from clash_geometry import box_from_points, box_intersection, find_candidate_pairs
+from clash_voxels import VoxelGrid, estimate_overlap_volume
+from clash_snapshot import SnapshotWriter
+from clash_tiles import split_tiles, tile_owns_pair
+from clash_scheduler import Phase, TimeSlicedJob
+from clash_estimate import ProgressiveEstimate, sampling_order
+
+# Detail levels ordered from cheapest to most accurate
+DETAIL_LEVELS = ['Coarse', 'Medium', 'Fine']
+
+
+def element_version_stamp(element):
+    """Cheap stamp that changes when an element is edited"""
+    # VersionGuid is only exposed by newer Revit versions
+    version = getattr(element, 'VersionGuid', None)
+    if version is not None:
+        return str(version)
+    
+    parts = [element.GetTypeId().IntegerValue]
+    bb = element.get_BoundingBox(None)
+    if bb:
+        parts.extend(round(value, 6) for value in
+                     (bb.Min.X, bb.Min.Y, bb.Min.Z, bb.Max.X, bb.Max.Y, bb.Max.Z))
+    return ','.join(str(part) for part in parts)
+
 
 class ClashDetectionEngine:
-    """Main clash detection engine"""
+    """Main clash detection engine
+
+    Pairs are screened with cheap Coarse geometry and only pairs that
+    survive screening are re-extracted at the confirmation detail level.
+    """
     
-    def __init__(self, doc, tolerance=0.001):
+    def __init__(self, doc, tolerance=0.001, screening_detail='Coarse',
+                 confirmation_detail='Fine', category_detail=None,
+                 voxel_resolution=None, max_elements_per_check=1000):
         self.doc = doc
         self.tolerance = tolerance  # in meters
         self.clashes = []
+        self.screening_detail = screening_detail
+        self.confirmation_detail = confirmation_detail
+        # Category name -> confirmation detail level override
+        self.category_detail = category_detail or {}
+        # (element id, detail level) -> list of solids
+        self._solid_cache = {}
+        # (element id, detail level) -> (vertices, triangles)
+        self._mesh_cache = {}
+        # Optional voxel screening tier for dense zones (feet per voxel)
+        self.voxel_grid = VoxelGrid(voxel_resolution) if voxel_resolution else None
+        self._voxel_cache = {}
+        # Element budget per tile in tiled mode
+        self.max_elements_per_check = max_elements_per_check
+    
+    @classmethod
+    def from_config(cls, doc, config):
+        """Create an engine from the clash_detection_config section"""
+        rules = config.get('detection_rules', {})
+        performance = config.get('performance', {})
+        return cls(doc,
+                   tolerance=rules.get('minimum_clash_volume', 0.001),
+                   screening_detail=performance.get('screening_detail_level', 'Coarse'),
+                   confirmation_detail=performance.get('confirmation_detail_level', 'Fine'),
+                   category_detail=performance.get('category_detail_levels'),
+                   voxel_resolution=performance.get('voxel_resolution'),
+                   max_elements_per_check=performance.get('max_elements_per_check', 1000))
+    
+    def get_element_solids(self, element, detail_level='Fine'):
+        """Extract all solid geometry from element at a detail level"""
+        key = (element.Id.IntegerValue, detail_level)
+        if key in self._solid_cache:
+            return self._solid_cache[key]
         
-    def get_element_solids(self, element):
-        """Extract all solid geometry from element"""
         options = DB.Options()
-        options.ComputeReferences = True
+        options.ComputeReferences = False
         options.IncludeNonVisibleObjects = False
+        options.DetailLevel = getattr(DB.ViewDetailLevel, detail_level)
         
         solids = []
         geo_elem = element.get_Geometry(options)
@@ -28,8 +93,132 @@ class ClashDetectionEngine:
             for geo_obj in geo_elem:
                 solids.extend(self._extract_solids(geo_obj))
         
+        self._solid_cache[key] = solids
         return solids
     
+    def clear_cache(self, element_ids=None):
+        """Drop cached geometry for some or all elements, at every detail level"""
+        caches = (self._solid_cache, self._mesh_cache, self._voxel_cache)
+        if element_ids is None:
+            for cache in caches:
+                cache.clear()
+            return
+        element_ids = set(element_ids)
+        for cache in caches:
+            for key in list(cache):
+                if key[0] in element_ids:
+                    del cache[key]
+    
+    def has_cached(self, element_id):
+        """Whether any geometry of an element (integer id) is cached"""
+        for level in DETAIL_LEVELS:
+            if (element_id, level) in self._solid_cache or (element_id, level) in self._mesh_cache:
+                return True
+        return (self.voxel_grid is not None and
+                (element_id, self.voxel_grid.resolution) in self._voxel_cache)
+    
+    def get_element_mesh(self, element, detail_level='Fine'):
+        """Triangulate element solids into (vertices, triangles) tuples"""
+        key = (element.Id.IntegerValue, detail_level)
+        if key in self._mesh_cache:
+            return self._mesh_cache[key]
+        
+        vertices = []
+        triangles = []
+        for solid in self.get_element_solids(element, detail_level):
+            for face in solid.Faces:
+                mesh = face.Triangulate()
+                if mesh is None:
+                    continue
+                base = len(vertices)
+                for point in mesh.Vertices:
+                    vertices.append((point.X, point.Y, point.Z))
+                for i in range(mesh.NumTriangles):
+                    triangle = mesh.get_Triangle(i)
+                    triangles.append((base + triangle.get_Index(0),
+                                      base + triangle.get_Index(1),
+                                      base + triangle.get_Index(2)))
+        
+        self._mesh_cache[key] = (vertices, triangles)
+        return vertices, triangles
+    
+    def write_snapshot(self, elements, path, previous=None, detail_level='Fine'):
+        """Write element meshes to a snapshot file
+
+        Elements whose version stamp matches the previous snapshot are
+        copied across instead of being re-extracted. Geometry extracted
+        here is released once written, so exporting a large model does not
+        fill the engine caches. Returns the number of (extracted, reused)
+        elements.
+        """
+        metadata = {
+            'document': self.doc.Title,
+            'detail_level': detail_level
+        }
+        reusable = previous is not None and previous.metadata.get('detail_level') == detail_level
+        extracted = reused = 0
+        
+        with SnapshotWriter(path, metadata) as writer:
+            for element in elements:
+                element_id = element.Id.IntegerValue
+                stamp = element_version_stamp(element)
+                if reusable and element_id in previous and previous.stamp(element_id) == stamp:
+                    writer.add_from(previous, element_id)
+                    reused += 1
+                    continue
+                
+                cached = self.has_cached(element_id)
+                vertices, triangles = self.get_element_mesh(element, detail_level)
+                level = self.doc.GetElement(element.LevelId)
+                writer.add(element_id, vertices, triangles,
+                           category_id=element.Category.Id.IntegerValue if element.Category else -1,
+                           level_id=element.LevelId.IntegerValue,
+                           unique_id=element.UniqueId,
+                           stamp=stamp,
+                           category=element.Category.Name if element.Category else '',
+                           level=level.Name if level else '',
+                           name=element.Name)
+                if not cached:
+                    self.clear_cache([element_id])
+                extracted += 1
+        
+        return extracted, reused
+    
+    def get_screening_mesh(self, element):
+        """Mesh at screening detail, or at confirmation detail when that is empty
+
+        Coarse geometry of single-line pipes and ducts has no solids.
+        """
+        vertices, triangles = self.get_element_mesh(element, self.screening_detail)
+        if not triangles:
+            vertices, triangles = self.get_element_mesh(
+                element, self.get_confirmation_detail(element, element))
+        return vertices, triangles
+    
+    def get_element_voxels(self, element):
+        """Voxelize element at screening detail, falling back to confirmation detail"""
+        key = (element.Id.IntegerValue, self.voxel_grid.resolution)
+        if key in self._voxel_cache:
+            return self._voxel_cache[key]
+        
+        vertices, triangles = self.get_screening_mesh(element)
+        shape = self.voxel_grid.voxelize_mesh(vertices, triangles) if triangles else None
+        
+        self._voxel_cache[key] = shape
+        return shape
+    
+    def get_confirmation_detail(self, elem1, elem2):
+        """Finest confirmation detail level required by either element's category
+
+        An override only lowers the level of a pair when both categories
+        allow it: Walls set to Coarse still confirm at Fine against Pipes.
+        """
+        levels = []
+        for elem in (elem1, elem2):
+            name = elem.Category.Name if elem.Category else None
+            levels.append(self.category_detail.get(name, self.confirmation_detail))
+        return max(levels, key=DETAIL_LEVELS.index)
+    
     def _extract_solids(self, geo_obj):
         """Recursively extract solids from geometry object"""
         solids = []
@@ -48,23 +237,135 @@ class ClashDetectionEngine:
     
     def check_clash(self, elem1, elem2):
         """Check if two elements clash"""
-        solids1 = self.get_element_solids(elem1)
-        solids2 = self.get_element_solids(elem2)
+        clash = self.detect_clash(elem1, elem2)
+        if clash:
+            return True, clash['volume']
+        return False, 0
+    
+    def detect_clash(self, elem1, elem2):
+        """Screen a pair at screening detail, then confirm at finer detail
+
+        Returns a clash dict recording the detail level that decided it,
+        or None when the pair does not clash.
+        """
+        confirm_level = self.get_confirmation_detail(elem1, elem2)
+        screen_level = self.screening_detail
+        voxelized = False
+        
+        if self.voxel_grid:
+            shape1 = self.get_element_voxels(elem1)
+            shape2 = self.get_element_voxels(elem2)
+            if shape1 and shape2:
+                voxelized = True
+                # Voxel shells are conservative, so no shared voxel means
+                # the meshes cannot touch
+                if not shape1.overlaps(shape2):
+                    return None
+        
+        if DETAIL_LEVELS.index(screen_level) < DETAIL_LEVELS.index(confirm_level):
+            screen_solids1 = self.get_element_solids(elem1, screen_level)
+            screen_solids2 = self.get_element_solids(elem2, screen_level)
+            # Coarse geometry can be empty (e.g. single-line pipes), in which
+            # case the pair cannot be screened and goes straight to confirmation
+            if screen_solids1 and screen_solids2:
+                hit, _, _ = self._intersect_solids(screen_solids1, screen_solids2)
+                if not hit:
+                    return None
         
+        hit, volume, centroid = self._intersect_solids(
+            self.get_element_solids(elem1, confirm_level),
+            self.get_element_solids(elem2, confirm_level),
+            want_centroid=True
+        )
+        if not hit:
+            return None
+        
+        # Shell overlap overstates volume, so sample the meshes instead
+        voxel_volume = self._estimate_voxel_volume(elem1, elem2) if voxelized else None
+        
+        return {
+            'elem1': elem1,
+            'elem2': elem2,
+            'volume': volume,
+            'detail_level': confirm_level,
+            'voxel_volume': voxel_volume,
+            'centroid': centroid
+        }
+    
+    def _estimate_voxel_volume(self, elem1, elem2):
+        """Approximate overlap volume of two meshes inside their common box"""
+        mesh1 = self.get_screening_mesh(elem1)
+        mesh2 = self.get_screening_mesh(elem2)
+        region = box_intersection(box_from_points(mesh1[0]), box_from_points(mesh2[0]))
+        if region is None:
+            return 0.0
+        return estimate_overlap_volume(mesh1, mesh2, region)
+    
+    def detect_tiled(self, element_ids, matrix=None, progress=None, table=None):
+        """Detect clashes tile by tile, yielding each clash as it is found
+
+        Only a compact (id, AABB) table is kept for the whole model. The
+        extent is split into XY tiles of at most max_elements_per_check
+        elements; geometry is loaded for one tile at a time and released
+        before the next, except for elements the next tile shares. Each
+        pair is reported by exactly one tile, so boundary clashes are
+        neither missed nor duplicated. A prebuilt BoundingBoxTable of the
+        same elements can be passed in to skip collection.
+        """
+        if table is None:
+            table = BoundingBoxTable(self.doc, element_ids)
+        
+        tiles = split_tiles(table.items(), self.max_elements_per_check)
+        for index, (tile, items) in enumerate(tiles):
+            if progress:
+                progress(index, len(tiles))
+            
+            for id1, id2 in find_candidate_pairs(items):
+                if not tile_owns_pair(tile, table.box(id1), table.box(id2)):
+                    continue
+                elem1 = self.doc.GetElement(DB.ElementId(id1))
+                elem2 = self.doc.GetElement(DB.ElementId(id2))
+                if matrix and not (elem1.Category and elem2.Category and
+                                   matrix.allows(elem1.Category.Name, elem2.Category.Name)):
+                    continue
+                clash = self.detect_clash(elem1, elem2)
+                if clash:
+                    yield clash
+            
+            # Release geometry that the next tile does not need
+            keep = set(item[0] for item in tiles[index + 1][1]) if index + 1 < len(tiles) else set()
+            self.clear_cache(item[0] for item in items if item[0] not in keep)
+    
+    def _intersect_solids(self, solids1, solids2, want_centroid=False):
+        """Boolean-intersect two solid lists, returning (clashes, volume, centroid)
+
+        With want_centroid, centroid is an (x, y, z) tuple of the
+        intersection solid; it is None otherwise, when Revit cannot compute
+        it, or when only the bounding box fallback found the clash.
+        """
         for solid1 in solids1:
             for solid2 in solids2:
                 try:
                     intersection = DB.BooleanOperationsUtils.ExecuteBooleanOperation(
                         solid1, solid2, DB.BooleanOperationsType.Intersect
                     )
-                    if intersection and intersection.Volume > self.tolerance:
-                        return True, intersection.Volume
                 except:
                     # Fallback to bounding box check
                     if self._check_bounding_box_intersection(solid1, solid2):
-                        return True, 0
+                        return True, 0, None
+                    continue
+                
+                if intersection and intersection.Volume > self.tolerance:
+                    centroid = None
+                    if want_centroid:
+                        try:
+                            point = intersection.ComputeCentroid()
+                            centroid = (point.X, point.Y, point.Z)
+                        except:
+                            pass
+                    return True, intersection.Volume, centroid
         
-        return False, 0
+        return False, 0, None
     
     def _check_bounding_box_intersection(self, solid1, solid2):
         """Check if bounding boxes of two solids intersect"""
@@ -80,7 +381,11 @@ class ClashDetectionEngine:
                 bb1.Min.Z <= bb2.Max.Z and bb1.Max.Z >= bb2.Min.Z)
     
     def get_clash_point(self, elem1, elem2):
-        """Get approximate center point of clash"""
+        """Get approximate center point of clash
+
+        For many clashes use BoundingBoxTable.clash_boxes, which reads
+        cached boxes instead of querying both elements each time.
+        """
         bb1 = elem1.get_BoundingBox(None)
         bb2 = elem2.get_BoundingBox(None)
         
@@ -103,6 +408,181 @@ class ClashDetectionEngine:
         return None
 
 
+class DetectionJob(TimeSlicedJob):
+    """Whole-model detection as resumable phases for background runs
+
+    Collection, pair finding and pair checks are split into small batches
+    so a TimeSlicedJob driver can interleave them with the UI. Pairs are
+    checked tile by tile and an element's geometry is released after its
+    last pending check, keeping memory near one tile's worth as in
+    detect_tiled. Clashes are appended to results as they are confirmed.
+    """
+    
+    def __init__(self, engine, element_ids, matrix=None, clock=time.time, table=None):
+        self.engine = engine
+        self.matrix = matrix
+        # A prebuilt table of the same elements skips the collecting phase
+        self.table = table or BoundingBoxTable(engine.doc, [])
+        self.pairs = []
+        self.results = []
+        # Element id -> checks still to run that need its geometry
+        self._pending = {}
+        TimeSlicedJob.__init__(self, [
+            Phase('Collecting', [] if table else list(element_ids),
+                  self.table.extend, batch_size=500),
+            Phase('Finding pairs', self._plan_tiles, self._find_pairs),
+            Phase('Checking pairs', self._check_order, self._check_pairs, batch_size=20)
+        ], clock)
+    
+    def _plan_tiles(self):
+        return split_tiles(self.table.items(), self.engine.max_elements_per_check)
+    
+    def _find_pairs(self, tiles):
+        for tile, items in tiles:
+            for id1, id2 in find_candidate_pairs(items):
+                if tile_owns_pair(tile, self.table.box(id1), self.table.box(id2)):
+                    self.pairs.append((id1, id2))
+    
+    def _pair_elements(self):
+        return sorted(set(element_id for pair in self.pairs for element_id in pair))
+    
+    def _check_order(self):
+        self._hold(self.pairs)
+        return self.pairs
+    
+    def _hold(self, pairs):
+        """Count the pending checks of every element in pairs"""
+        self._pending = {}
+        for pair in pairs:
+            for element_id in pair[:2]:
+                self._pending[element_id] = self._pending.get(element_id, 0) + 1
+    
+    def _release(self, pairs):
+        """Drop geometry of elements whose last pending check is in pairs"""
+        finished = []
+        for pair in pairs:
+            for element_id in pair[:2]:
+                self._pending[element_id] -= 1
+                if not self._pending[element_id]:
+                    finished.append(element_id)
+        if finished:
+            self.engine.clear_cache(finished)
+    
+    def _check_pair(self, id1, id2):
+        doc = self.engine.doc
+        elem1 = doc.GetElement(DB.ElementId(id1))
+        elem2 = doc.GetElement(DB.ElementId(id2))
+        # Elements deleted while the job was paused are skipped
+        if elem1 is None or elem2 is None:
+            return None
+        if self.matrix and not (elem1.Category and elem2.Category and
+                                self.matrix.allows(elem1.Category.Name, elem2.Category.Name)):
+            return None
+        return self.engine.detect_clash(elem1, elem2)
+    
+    def _check_pairs(self, pairs):
+        for id1, id2 in pairs:
+            clash = self._check_pair(id1, id2)
+            if clash:
+                self.results.append(clash)
+        self._release(pairs)
+
+
+class EstimationJob(DetectionJob):
+    """Progressive clash estimate that can be promoted to a full run
+
+    After the broad phase, candidate pairs are grouped by level and
+    category pair and checked in stratified random order, updating
+    estimate after every batch. The job stops once sample_size pairs are
+    checked; promote() lets it carry on through the remaining pairs
+    without repeating any, so it ends with the same results as a full run.
+    """
+    
+    def __init__(self, engine, element_ids, matrix=None, sample_size=2000, z=1.96,
+                 clock=time.time, table=None, seed=None):
+        DetectionJob.__init__(self, engine, element_ids, matrix, clock, table)
+        self.sample_size = sample_size
+        self.z = z
+        self.seed = seed
+        self.promoted = False
+        self.estimate = None
+        # Element id -> (level name, category name)
+        self._classes = {}
+        self._level_names = {}
+        self.phases = self.phases[:2] + [
+            Phase('Classifying', self._pair_elements, self._classify, batch_size=500),
+            Phase('Checking pairs', self._sample_order, self._check_sample, batch_size=10)
+        ]
+    
+    @property
+    def complete(self):
+        """True once every candidate pair has been checked"""
+        return not self.cancelled and self.phase_index >= len(self.phases)
+    
+    @property
+    def done(self):
+        if TimeSlicedJob.done.fget(self):
+            return True
+        return (not self.promoted and self.estimate is not None and
+                self.estimate.sampled >= self.sample_size)
+    
+    def promote(self):
+        """Continue past the sample to check every candidate pair"""
+        self.promoted = True
+    
+    def _level_name(self, element):
+        level_id = element.LevelId
+        if level_id is None or level_id == DB.ElementId.InvalidElementId:
+            param = element.get_Parameter(DB.BuiltInParameter.SCHEDULE_LEVEL_PARAM)
+            level_id = param.AsElementId() if param else None
+        if level_id is None or level_id == DB.ElementId.InvalidElementId:
+            return 'Unknown'
+        key = level_id.IntegerValue
+        if key not in self._level_names:
+            level = self.engine.doc.GetElement(level_id)
+            self._level_names[key] = level.Name if level else 'Unknown'
+        return self._level_names[key]
+    
+    def _classify(self, element_ids):
+        for element_id in element_ids:
+            element = self.engine.doc.GetElement(DB.ElementId(element_id))
+            if element is None:
+                continue
+            category = element.Category.Name if element.Category else ''
+            self._classes[element_id] = (self._level_name(element), category)
+    
+    def _stratum(self, id1, id2):
+        level1, category1 = self._classes[id1]
+        level2, category2 = self._classes[id2]
+        level = level1 if level1 != 'Unknown' else level2
+        return (level, ' | '.join(sorted((category1, category2))))
+    
+    def _sample_order(self):
+        items = []
+        for id1, id2 in self.pairs:
+            if id1 not in self._classes or id2 not in self._classes:
+                continue
+            if self.matrix and not self.matrix.allows(self._classes[id1][1],
+                                                      self._classes[id2][1]):
+                continue
+            items.append((id1, id2, self._stratum(id1, id2)))
+        
+        strata = {}
+        for item in items:
+            strata[item[2]] = strata.get(item[2], 0) + 1
+        self.estimate = ProgressiveEstimate(strata, self.z)
+        self._hold(items)
+        return sampling_order(items, lambda item: item[2], self.seed)
+    
+    def _check_sample(self, items):
+        for id1, id2, stratum in items:
+            clash = self._check_pair(id1, id2)
+            if clash:
+                self.results.append(clash)
+            self.estimate.record(stratum, clash is not None)
+        self._release(items)
+
+
 class ClashFilter:
     """Filter clashes based on various criteria"""
     
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Voxel Clash Screening
+Rasterizes triangle meshes into sparse bitsets over a shared grid so that
+dense candidate pairs can be screened with bitwise AND. The overlap count
+gives an approximate clash volume at no extra cost.
+
+Pure Python (IronPython 2.7 and CPython 3), no Revit API imports.
+Run this module directly to benchmark resolution against accuracy and time.
+"""
+
+from math import floor, ceil
+
+from clash_geometry import box_mesh, box_intersection, box_volume
+
+# Tiny offsets keep row sample points off shared triangle edges,
+# so each crossing of a closed mesh is counted exactly once
+_JITTER_Y = 1.31e-6
+_JITTER_Z = 2.17e-6
+
+
+class VoxelShape:
+    """Sparse voxel bitset of one element
+
+    Each (j, k) row along X is a Python integer used as a bitset,
+    with bit 0 at grid column x0.
+    """
+
+    def __init__(self, resolution, x0, rows):
+        self.resolution = resolution
+        self.x0 = x0
+        self.rows = rows
+
+    @property
+    def count(self):
+        """Number of filled voxels"""
+        return sum(_popcount(mask) for mask in self.rows.values())
+
+    @property
+    def volume(self):
+        """Approximate solid volume"""
+        return self.count * self.resolution ** 3
+
+    def overlap_count(self, other):
+        """Number of voxels filled in both shapes"""
+        if len(other.rows) < len(self.rows):
+            return other.overlap_count(self)
+
+        total = 0
+        shift = other.x0 - self.x0
+        for key, mask in self.rows.items():
+            other_mask = other.rows.get(key)
+            if not other_mask:
+                continue
+            # Align both rows to the larger x0 before ANDing
+            if shift >= 0:
+                total += _popcount((mask >> shift) & other_mask)
+            else:
+                total += _popcount(mask & (other_mask >> -shift))
+        return total
+
+    def overlaps(self, other):
+        """Whether any voxel is filled in both shapes, stopping at the first"""
+        if len(other.rows) < len(self.rows):
+            return other.overlaps(self)
+
+        shift = other.x0 - self.x0
+        for key, mask in self.rows.items():
+            other_mask = other.rows.get(key)
+            if not other_mask:
+                continue
+            if shift >= 0:
+                if (mask >> shift) & other_mask:
+                    return True
+            elif mask & (other_mask >> -shift):
+                return True
+        return False
+
+    def overlap_volume(self, other):
+        """Approximate volume shared by both shapes"""
+        return self.overlap_count(other) * self.resolution ** 3
+
+
+class VoxelGrid:
+    """Shared voxel grid at a fixed resolution (model units per voxel)"""
+
+    def __init__(self, resolution, origin=(0.0, 0.0, 0.0)):
+        self.resolution = float(resolution)
+        self.origin = origin
+
+    def voxelize_mesh(self, vertices, triangles, region=None, surface=True):
+        """Rasterize a closed triangle mesh into a VoxelShape
+
+        Interior voxels are filled by even-odd crossings along X rows.
+        With surface set, every voxel a triangle passes through is set
+        too, so the shell is conservative: two meshes that touch always
+        share a voxel, however thin they are, which screening relies on.
+        Without it only crossing and vertex voxels mark the surface; that
+        is faster and closer for volume estimates but can miss thin
+        elements. When a region box is given, only voxels inside it are
+        produced.
+        """
+        res = self.resolution
+        ox, oy, oz = self.origin
+        crossings = {}
+        cells = []
+        if region:
+            lo = self.cell(region[0], region[1], region[2])
+            hi = self.cell(region[3], region[4], region[5])
+
+        for a, b, c in triangles:
+            p1, p2, p3 = vertices[a], vertices[b], vertices[c]
+            if surface:
+                cells.extend(self._surface_cells((p1, p2, p3), region and (lo, hi)))
+
+            # Barycentric setup in the YZ projection
+            det = (p2[1] - p1[1]) * (p3[2] - p1[2]) - (p3[1] - p1[1]) * (p2[2] - p1[2])
+            if abs(det) < 1e-12:
+                continue
+
+            y_min = min(p1[1], p2[1], p3[1])
+            y_max = max(p1[1], p2[1], p3[1])
+            z_min = min(p1[2], p2[2], p3[2])
+            z_max = max(p1[2], p2[2], p3[2])
+            j_start = int(ceil((y_min - oy) / res - 0.5 - _JITTER_Y))
+            j_end = int(floor((y_max - oy) / res - 0.5 - _JITTER_Y))
+            k_start = int(ceil((z_min - oz) / res - 0.5 - _JITTER_Z))
+            k_end = int(floor((z_max - oz) / res - 0.5 - _JITTER_Z))
+            if region:
+                j_start, j_end = max(j_start, lo[1]), min(j_end, hi[1])
+                k_start, k_end = max(k_start, lo[2]), min(k_end, hi[2])
+
+            for j in range(j_start, j_end + 1):
+                y = oy + (j + 0.5 + _JITTER_Y) * res
+                for k in range(k_start, k_end + 1):
+                    z = oz + (k + 0.5 + _JITTER_Z) * res
+                    u = ((y - p1[1]) * (p3[2] - p1[2]) - (p3[1] - p1[1]) * (z - p1[2])) / det
+                    v = ((p2[1] - p1[1]) * (z - p1[2]) - (y - p1[1]) * (p2[2] - p1[2])) / det
+                    if u < 0 or v < 0 or u + v > 1:
+                        continue
+                    x = p1[0] + u * (p2[0] - p1[0]) + v * (p3[0] - p1[0])
+                    crossings.setdefault((j, k), []).append(x)
+
+        for key, xs in crossings.items():
+            xs.sort()
+            if not surface:
+                for x in xs:
+                    cells.append((int(floor((x - ox) / res)), key))
+            for n in range(0, len(xs) - 1, 2):
+                i_start = int(ceil((xs[n] - ox) / res - 0.5))
+                i_end = int(floor((xs[n + 1] - ox) / res - 0.5))
+                if region:
+                    i_start, i_end = max(i_start, lo[0]), min(i_end, hi[0])
+                for i in range(i_start, i_end + 1):
+                    cells.append((i, key))
+
+        if not surface:
+            for vertex in vertices:
+                i, j, k = self.cell(*vertex)
+                cells.append((i, (j, k)))
+            if region:
+                cells = [(i, key) for i, key in cells
+                         if lo[0] <= i <= hi[0] and lo[1] <= key[0] <= hi[1] and
+                         lo[2] <= key[1] <= hi[2]]
+        return self._build_shape(cells)
+
+    def _surface_cells(self, triangle, bounds=None):
+        """(i, (j, k)) of every voxel a triangle touches
+
+        The triangle is clipped to each (j, k) row's YZ square in turn;
+        the X range of what remains gives the voxels of that row.
+        """
+        res = self.resolution
+        ox, oy, oz = self.origin
+        j_start = int(floor((min(p[1] for p in triangle) - oy) / res))
+        j_end = int(floor((max(p[1] for p in triangle) - oy) / res))
+        k_start = int(floor((min(p[2] for p in triangle) - oz) / res))
+        k_end = int(floor((max(p[2] for p in triangle) - oz) / res))
+        if bounds:
+            lo, hi = bounds
+            j_start, j_end = max(j_start, lo[1]), min(j_end, hi[1])
+            k_start, k_end = max(k_start, lo[2]), min(k_end, hi[2])
+
+        cells = []
+        for j in range(j_start, j_end + 1):
+            y0 = oy + j * res
+            strip = _clip(_clip(list(triangle), 1, y0, 1.0), 1, y0 + res, -1.0)
+            if not strip:
+                continue
+            for k in range(k_start, k_end + 1):
+                z0 = oz + k * res
+                piece = _clip(_clip(strip, 2, z0, 1.0), 2, z0 + res, -1.0)
+                if not piece:
+                    continue
+                i_start = int(floor((min(p[0] for p in piece) - ox) / res))
+                i_end = int(floor((max(p[0] for p in piece) - ox) / res))
+                if bounds:
+                    i_start, i_end = max(i_start, lo[0]), min(i_end, hi[0])
+                for i in range(i_start, i_end + 1):
+                    cells.append((i, (j, k)))
+        return cells
+
+    def cell(self, x, y, z):
+        """Grid indices of the voxel containing a point"""
+        res = self.resolution
+        return (int(floor((x - self.origin[0]) / res)),
+                int(floor((y - self.origin[1]) / res)),
+                int(floor((z - self.origin[2]) / res)))
+
+    def voxelize_box(self, box):
+        """Rasterize an axis-aligned box"""
+        vertices, triangles = box_mesh(box)
+        return self.voxelize_mesh(vertices, triangles)
+
+    def _build_shape(self, cells):
+        if not cells:
+            return VoxelShape(self.resolution, 0, {})
+        x0 = min(cell[0] for cell in cells)
+        rows = {}
+        for i, key in cells:
+            rows[key] = rows.get(key, 0) | (1 << (i - x0))
+        return VoxelShape(self.resolution, x0, rows)
+
+
+def _clip(polygon, axis, value, sign):
+    """Part of a convex polygon where sign * (p[axis] - value) >= 0"""
+    result = []
+    count = len(polygon)
+    for n in range(count):
+        current = polygon[n]
+        following = polygon[(n + 1) % count]
+        d1 = sign * (current[axis] - value)
+        d2 = sign * (following[axis] - value)
+        if d1 >= 0:
+            result.append(current)
+        if (d1 >= 0) != (d2 >= 0):
+            t = d1 / (d1 - d2)
+            result.append(tuple(current[m] + t * (following[m] - current[m]) for m in range(3)))
+    return result
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+def estimate_overlap_volume(mesh1, mesh2, region, cells=16):
+    """Approximate overlap volume of two meshes inside a region box
+
+    The grid is sized to the region, so cost stays bounded by cells ** 3
+    however large the elements are.
+    """
+    size = max(region[3] - region[0], region[4] - region[1], region[5] - region[2])
+    grid = VoxelGrid(max(size / float(cells), 1e-6), origin=region[:3])
+    shape1 = grid.voxelize_mesh(mesh1[0], mesh1[1], region=region, surface=False)
+    shape2 = grid.voxelize_mesh(mesh2[0], mesh2[1], region=region, surface=False)
+    return shape1.overlap_volume(shape2)
+
+
+def benchmark(resolutions=(2.0, 1.0, 0.5, 0.25), pair_count=200):
+    """Time voxel screening of overlapping box pairs against exact volumes"""
+    import random
+    import time
+
+    rng = random.Random(42)
+    pairs = []
+    for _ in range(pair_count):
+        x, y, z = rng.uniform(0, 50), rng.uniform(0, 50), rng.uniform(0, 10)
+        # Includes pipes and sheets thinner than a voxel
+        box1 = (x, y, z, x + rng.uniform(1, 10), y + rng.uniform(0.05, 2), z + rng.uniform(0.05, 4))
+        dx, dy, dz = rng.uniform(-2, 2), rng.uniform(-1, 1), rng.uniform(-1, 1)
+        box2 = (box1[0] + dx, box1[1] + dy, box1[2] + dz,
+                box1[0] + dx + rng.uniform(0.5, 3), box1[1] + dy + rng.uniform(0.5, 3),
+                box1[2] + dz + rng.uniform(0.5, 3))
+        pairs.append((box1, box2))
+
+    print("{:>10} {:>10} {:>12} {:>12} {:>16}".format(
+        "resolution", "seconds", "mean_error", "agreement", "false_negatives"))
+    for resolution in resolutions:
+        grid = VoxelGrid(resolution)
+        error = 0.0
+        agree = 0
+        # Overlapping pairs the screen would reject: these lose real clashes
+        missed = 0
+        start = time.time()
+        for box1, box2 in pairs:
+            shape1 = grid.voxelize_box(box1)
+            shape2 = grid.voxelize_box(box2)
+            approx = shape1.overlap_volume(shape2)
+            common = box_intersection(box1, box2)
+            exact = box_volume(common) if common else 0.0
+            error += abs(approx - exact)
+            if (approx > 0) == (exact > 0):
+                agree += 1
+            elif exact > 0:
+                missed += 1
+        elapsed = time.time() - start
+        print("{:>10} {:>10.3f} {:>12.3f} {:>11.1f}% {:>16}".format(
+            resolution, elapsed, error / len(pairs), 100.0 * agree / len(pairs), missed))
+
+if __name__ == '__main__':
+    benchmark()
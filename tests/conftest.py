@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Put lib/ on the path so the pure-Python modules import as in pyRevit"""
+
+import os
+import sys
+
+LIB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib')
+if LIB not in sys.path:
+    sys.path.insert(0, LIB)
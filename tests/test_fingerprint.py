@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Clash fingerprints and run-to-run status matching"""
+
+from clash_fingerprint import (ClashHistory, clash_fingerprint, pair_key, STATUS_ACTIVE,
+                               STATUS_NEW, STATUS_REINTRODUCED, STATUS_RESOLVED)
+
+WALL_PIPE = pair_key('wall-1', 'pipe-1', 'Walls', 'Pipes')
+BEAM_DUCT = pair_key('beam-1', 'duct-1', 'Structural Framing', 'Ducts')
+
+
+def item(key, point):
+    return (clash_fingerprint(key, point, quantum=1.0), key)
+
+
+def test_pair_key_ignores_order():
+    assert pair_key('a', 'b', 'Walls', 'Pipes') == pair_key('b', 'a', 'Pipes', 'Walls')
+
+
+def test_fingerprint_is_stable_within_a_grid_cell():
+    assert (clash_fingerprint(WALL_PIPE, (1.2, 2.3, 0.4), 1.0) ==
+            clash_fingerprint(WALL_PIPE, (1.8, 2.1, 0.9), 1.0))
+    assert (clash_fingerprint(WALL_PIPE, (1.2, 2.3, 0.4), 1.0) !=
+            clash_fingerprint(WALL_PIPE, (5.2, 2.3, 0.4), 1.0))
+
+
+def test_new_then_active_then_resolved_then_reintroduced():
+    history = ClashHistory()
+    clash = item(WALL_PIPE, (1.5, 1.5, 1.5))
+
+    statuses, summary = history.match([clash], 'run1')
+    assert statuses == [STATUS_NEW]
+    assert summary == {'new': 1, 'active': 0, 'reintroduced': 0, 'resolved': 0}
+
+    statuses, summary = history.match([clash], 'run2')
+    assert statuses == [STATUS_ACTIVE]
+
+    statuses, summary = history.match([], 'run3')
+    assert statuses == [] and summary['resolved'] == 1
+    assert history.entries[clash[0]][1] == STATUS_RESOLVED
+
+    statuses, summary = history.match([clash], 'run4')
+    assert statuses == [STATUS_REINTRODUCED]
+    assert summary['reintroduced'] == 1
+    # First seen is kept, last seen follows the run
+    assert history.entries[clash[0]][2:] == ['run1', 'run4']
+
+
+def test_resolved_clashes_are_counted_once():
+    history = ClashHistory()
+    history.match([item(WALL_PIPE, (0, 0, 0)), item(BEAM_DUCT, (9, 9, 9))], 'run1')
+    _, summary = history.match([item(BEAM_DUCT, (9, 9, 9))], 'run2')
+    assert summary['resolved'] == 1
+    _, summary = history.match([item(BEAM_DUCT, (9, 9, 9))], 'run3')
+    assert summary['resolved'] == 0
+
+
+def test_moved_clash_keeps_its_history():
+    history = ClashHistory()
+    history.match([item(WALL_PIPE, (0.5, 0.5, 0.5))], 'run1')
+
+    moved = item(WALL_PIPE, (7.5, 0.5, 0.5))
+    statuses, summary = history.match([moved], 'run2')
+    assert statuses == [STATUS_ACTIVE]
+    assert summary['resolved'] == 0
+    assert list(history.entries) == [moved[0]]
+    assert history.entries[moved[0]][2] == 'run1'
+
+
+def test_second_clash_of_same_pair_is_new():
+    history = ClashHistory()
+    history.match([item(WALL_PIPE, (0.5, 0.5, 0.5))], 'run1')
+    statuses, _ = history.match([item(WALL_PIPE, (0.5, 0.5, 0.5)),
+                                 item(WALL_PIPE, (7.5, 0.5, 0.5))], 'run2')
+    assert statuses == [STATUS_ACTIVE, STATUS_NEW]
+
+
+def test_duplicate_fingerprints_share_a_status():
+    history = ClashHistory()
+    clash = item(WALL_PIPE, (0.5, 0.5, 0.5))
+    statuses, summary = history.match([clash, clash], 'run1')
+    assert statuses == [STATUS_NEW, STATUS_NEW]
+    assert len(history.entries) == 1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'history' / 'model.json')
+    history = ClashHistory()
+    history.match([item(WALL_PIPE, (0, 0, 0))], 'run1')
+    history.runs.append({'date': 'run1', 'clash_count': 1})
+    history.save(path)
+
+    assert ClashHistory.load_runs(path) == [{'date': 'run1', 'clash_count': 1}]
+    loaded = ClashHistory.load(path)
+    statuses, _ = loaded.match([item(WALL_PIPE, (0, 0, 0))], 'run2')
+    assert statuses == [STATUS_ACTIVE]
+
+
+def test_missing_history_starts_empty(tmp_path):
+    history = ClashHistory.load(str(tmp_path / 'none.json'))
+    assert history.entries == {} and history.runs == []
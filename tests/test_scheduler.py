@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Time-sliced jobs driven by a simulated clock and Idling event loop"""
+
+from clash_scheduler import IdlingDriver, Phase, TimeSlicedJob
+
+
+class FakeClock:
+    """Clock that advances only when work is done"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEvent:
+    """Stand-in for a .NET event supporting += and -="""
+
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self.handlers.remove(handler)
+        return self
+
+
+class FakeArgs:
+    def __init__(self):
+        self.again = False
+
+    def SetRaiseWithoutDelay(self):
+        self.again = True
+
+
+class FakeHost:
+    """Host whose Idling event fires once per loop turn while handlers are attached"""
+
+    def __init__(self):
+        self.Idling = FakeEvent()
+        self.turns = 0
+
+    def idle(self, turns=1):
+        for _ in range(turns):
+            if not self.Idling.handlers:
+                return
+            self.turns += 1
+            args = FakeArgs()
+            for handler in list(self.Idling.handlers):
+                handler(self, args)
+
+
+def make_job(clock, cost=0.01):
+    """Two phases; each item costs `cost` simulated seconds"""
+    seen = []
+
+    def work(batch):
+        for item in batch:
+            clock.now += cost
+            seen.append(item)
+
+    job = TimeSlicedJob([
+        Phase('first', list(range(10)), work, batch_size=2),
+        # Evaluated when the phase starts, after the first phase finished
+        Phase('second', lambda: [len(seen) + n for n in range(5)], work, batch_size=1)
+    ], clock)
+    return job, seen
+
+
+def test_slices_stop_at_budget_and_always_advance():
+    clock = FakeClock()
+    job, seen = make_job(clock)
+    assert job.run_slice(budget=0.03)
+    # Batches of two items at 0.01 s each: the second batch crosses the budget
+    assert seen == [0, 1, 2, 3]
+    assert job.progress == ('first', 4, 10)
+
+    # A zero budget still runs one batch
+    job.run_slice(budget=0.0)
+    assert len(seen) == 6
+
+
+def test_run_to_completion_evaluates_later_phases_lazily():
+    clock = FakeClock()
+    job, seen = make_job(clock)
+    slices = 0
+    while job.run_slice(budget=0.05):
+        slices += 1
+    assert job.done
+    assert seen == list(range(10)) + [10, 11, 12, 13, 14]
+    assert slices > 1
+    assert job.progress == ('done', 0, 0)
+
+
+def test_listeners_see_every_slice():
+    clock = FakeClock()
+    job, _ = make_job(clock)
+    calls = []
+    job.add_listener(lambda j: calls.append(j.progress[0]))
+    while job.run_slice(budget=0.02):
+        pass
+    assert calls[0] == 'first'
+    assert calls[-1] == 'done'
+
+
+def test_idling_driver_runs_pauses_and_resumes_from_checkpoint():
+    clock = FakeClock()
+    job, seen = make_job(clock)
+    host = FakeHost()
+    driver = IdlingDriver(host, job, budget=0.02)
+
+    driver.start()
+    assert driver.running and len(host.Idling.handlers) == 1
+    host.idle(2)
+    done_before_pause = list(seen)
+    assert done_before_pause == [0, 1, 2, 3]
+
+    driver.pause()
+    assert not driver.running and not host.Idling.handlers
+    assert driver.checkpoint == {'phase': 0, 'offset': 4}
+    # No handler attached: idling does nothing
+    host.idle(5)
+    assert seen == done_before_pause
+
+    driver.start()
+    host.idle(100)
+    assert job.done
+    assert seen == list(range(10)) + [10, 11, 12, 13, 14]
+    # The driver detaches itself once the job finishes
+    assert not driver.running and not host.Idling.handlers
+
+
+def test_checkpoint_restore_across_phases():
+    clock = FakeClock()
+    job, seen = make_job(clock)
+    while job.progress[0] == 'first':
+        job.run_slice(budget=0.0)
+    job.run_slice(budget=0.0)
+    checkpoint = job.checkpoint()
+    assert checkpoint == {'phase': 1, 'offset': 1}
+
+    # Rewinding into the first phase reloads that phase's items
+    job.restore({'phase': 0, 'offset': 8})
+    job.run_slice(budget=0.0)
+    assert seen[-2:] == [8, 9]
+    assert job.progress[0] == 'second'
+
+
+def test_cancel_stops_after_current_batch():
+    clock = FakeClock()
+    job, seen = make_job(clock)
+    host = FakeHost()
+    driver = IdlingDriver(host, job, budget=0.0)
+    driver.start()
+    host.idle()
+    job.cancel()
+    host.idle()
+    assert job.done and job.cancelled
+    assert seen == [0, 1]
+    assert not host.Idling.handlers
+
+    # Restoring a checkpoint clears the cancellation
+    job.restore({'phase': 0, 'offset': 2})
+    assert not job.done
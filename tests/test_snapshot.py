@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Binary snapshot write, read and incremental rewrite"""
+
+import pytest
+
+from clash_geometry import box_mesh
+from clash_snapshot import GeometrySnapshot, SnapshotError, SnapshotWriter
+
+WALL = (0.0, 0.0, 0.0, 10.0, 0.5, 3.0)
+PIPE = (2.0, -1.0, 1.0, 2.25, 4.0, 1.25)
+
+
+def write(path):
+    with SnapshotWriter(str(path), {'detail_level': 'Fine'}) as writer:
+        vertices, triangles = box_mesh(WALL)
+        writer.add(101, vertices, triangles, category_id=-2000011, level_id=7,
+                   unique_id='wall-1', stamp='v1', category='Walls', level='L1',
+                   name=u'Basic Wall é')
+        vertices, triangles = box_mesh(PIPE)
+        writer.add(202, vertices, triangles, unique_id='pipe-1', stamp='v1',
+                   category='Pipes', level='L1', name='Pipe')
+
+
+def assert_box_close(actual, expected):
+    assert actual == pytest.approx(expected, abs=1e-6)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'a.snap'
+    write(path)
+
+    with GeometrySnapshot(str(path)) as snapshot:
+        assert len(snapshot) == 2
+        assert snapshot.element_ids == [101, 202]
+        assert 101 in snapshot and 303 not in snapshot
+        assert snapshot.metadata == {'detail_level': 'Fine'}
+
+        info = snapshot.info(101)
+        assert info['category_id'] == -2000011 and info['level_id'] == 7
+        assert info['name'] == u'Basic Wall é'
+        assert snapshot.stamp(202) == 'v1'
+        assert_box_close(snapshot.box(202), PIPE)
+
+        vertices, triangles = snapshot.mesh(101)
+        expected_vertices, expected_triangles = box_mesh(WALL)
+        assert [tuple(t) for t in triangles] == [tuple(t) for t in expected_triangles]
+        for vertex, expected in zip(vertices, expected_vertices):
+            assert vertex == pytest.approx(expected)
+
+
+def test_add_from_copies_elements_unchanged(tmp_path):
+    first = tmp_path / 'a.snap'
+    second = tmp_path / 'b.snap'
+    write(first)
+
+    with GeometrySnapshot(str(first)) as previous:
+        with SnapshotWriter(str(second), previous.metadata) as writer:
+            writer.add_from(previous, 202)
+            vertices, triangles = box_mesh(WALL)
+            writer.add(101, vertices, triangles, stamp='v2', name='Moved Wall')
+
+        with GeometrySnapshot(str(second)) as snapshot:
+            assert snapshot.element_ids == [202, 101]
+            assert snapshot.info(202) == previous.info(202)
+            assert snapshot.mesh(202) == previous.mesh(202)
+            assert snapshot.stamp(101) == 'v2'
+
+
+def test_rejects_foreign_and_truncated_files(tmp_path):
+    path = tmp_path / 'bad.snap'
+    path.write_bytes(b'not a snapshot at all, just some bytes of text padding it')
+    with pytest.raises(SnapshotError):
+        GeometrySnapshot(str(path))
+
+    path.write_bytes(b'')
+    with pytest.raises(SnapshotError):
+        GeometrySnapshot(str(path))
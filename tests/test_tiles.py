@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Tiled broad phase must match the untiled one exactly"""
+
+import random
+
+from clash_geometry import find_candidate_pairs
+from clash_tiles import make_tiles, split_tiles, tile_owns_pair
+
+
+def random_items(count, seed, size=200.0):
+    rng = random.Random(seed)
+    items = []
+    for element_id in range(count):
+        x, y, z = rng.uniform(0, size), rng.uniform(0, size), rng.uniform(0, 30)
+        # Mostly small elements plus a few long ones crossing many tiles
+        length = rng.uniform(20, 120) if rng.random() < 0.05 else rng.uniform(0.5, 6)
+        if rng.random() < 0.5:
+            box = (x, y, z, x + length, y + rng.uniform(0.2, 2), z + rng.uniform(0.2, 4))
+        else:
+            box = (x, y, z, x + rng.uniform(0.2, 2), y + length, z + rng.uniform(0.2, 4))
+        items.append((element_id, box))
+    return items
+
+
+def normalized(pairs):
+    return [tuple(sorted(pair)) for pair in pairs]
+
+
+def tiled_pairs(tiles, boxes):
+    pairs = []
+    for tile, tile_items in tiles:
+        for id1, id2 in find_candidate_pairs(tile_items):
+            if tile_owns_pair(tile, boxes[id1], boxes[id2]):
+                pairs.append((id1, id2))
+    return normalized(pairs)
+
+
+def test_split_tiles_matches_global_pairs_without_duplicates():
+    for seed in range(5):
+        items = random_items(1500, seed)
+        boxes = dict(items)
+        expected = set(normalized(find_candidate_pairs(items)))
+        for max_elements in (20, 100, 400):
+            pairs = tiled_pairs(split_tiles(items, max_elements), boxes)
+            assert len(pairs) == len(set(pairs))
+            assert set(pairs) == expected
+
+
+def test_pairs_on_tile_edges_are_owned_once():
+    # Boxes straddling the edge between two fixed tiles
+    items = [(0, (9.0, 0.0, 0.0, 11.0, 1.0, 1.0)), (1, (9.5, 0.5, 0.0, 10.5, 2.0, 1.0)),
+             (2, (10.0, 0.0, 0.0, 12.0, 1.0, 1.0))]
+    tiles = make_tiles((0.0, 0.0, 0.0, 20.0, 10.0, 1.0), 10.0)
+    boxes = dict(items)
+    owners = dict((pair, 0) for pair in normalized(find_candidate_pairs(items)))
+    for tile in tiles:
+        for id1, id2 in normalized(find_candidate_pairs(items)):
+            if tile_owns_pair(tile, boxes[id1], boxes[id2]):
+                owners[(id1, id2)] += 1
+    assert owners and all(count == 1 for count in owners.values())